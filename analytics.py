@@ -0,0 +1,216 @@
+# analytics.py
+# ------------------------------------------------------------
+# Těžké pandas výpočty mimo event loop – v pracovních procesech.
+#   - každý worker drží teplou kopii dat (mmap snapshot z data_store) podle verze;
+#     když se verze změní, přenačte se (snapshot, ne CSV parsování)
+#   - korutina zavolá `await run(fn, path, version, ...)` a dostane malý výsledek
+#   - ANALYTICS_WORKERS=0 -> stejné funkce běží ve vlákně (bez procesů)
+# ------------------------------------------------------------
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_power_df, load_vs_df, evict, name_ids
+
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", str(min(2, os.cpu_count() or 1))))
+WARM_MAX = int(os.getenv("ANALYTICS_WARM_FILES", "4"))   # kolik souborů drží worker v paměti (LRU)
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+# ----- stav uvnitř workeru -----
+# (druh, cesta) -> (verze, df); pořadí = LRU (nejstarší první)
+_WARM: Dict[Tuple[str, str], Tuple[Optional[str], pd.DataFrame]] = {}
+
+
+def _frame(kind: str, path: str, version: Optional[str]) -> pd.DataFrame:
+    key = (kind, path)
+    hit = _WARM.pop(key, None)
+    if hit is None or hit[0] != version:
+        df = load_power_df(path) if kind == "power" else load_vs_df(path)
+        hit = (version, df)
+    _WARM[key] = hit
+    while len(_WARM) > WARM_MAX:
+        # nejdéle nepoužitý soubor (typicky nečinný server) pryč
+        old_key = next(iter(_WARM))
+        del _WARM[old_key]
+        evict(old_key[1])
+    return hit[1]
+
+
+def _warm_up(paths: List[Tuple[str, str]]) -> int:
+    for kind, path in paths:
+        if os.path.exists(path):
+            _frame(kind, path, None)
+    return os.getpid()
+
+
+# ----- výpočty (běží ve workeru; vstupy i výstupy musí jít picklovat) -----
+def top_players(path: str, version: Optional[str]) -> pd.DataFrame:
+    """Žebříček power podle součtu max. hodnot 3 týmů (+ hotové řádky pro výpis)."""
+    df = _frame("power", path, version)
+    grp = df.groupby("player", as_index=False, observed=True).agg({"tank": "max", "rocket": "max", "air": "max"}).fillna(0.0)
+    grp["sum3"] = grp["tank"] + grp["rocket"] + grp["air"]
+    grp = grp.sort_values("sum3", ascending=False).reset_index(drop=True)
+    grp["player"] = grp["player"].astype(str)
+    grp["line"] = [f"{i+1}. {row.player}: total={row.sum3:,.1f} (tank={row.tank:,.1f}, rocket={row.rocket:,.1f}, air={row.air:,.1f})"
+                   for i, row in enumerate(grp.itertuples(index=False))]
+    return grp
+
+
+def growth_table(path: str, version: Optional[str], unit: str, days: int) -> Optional[pd.DataFrame]:
+    """
+    Růst všech hráčů za okno `days` dní jedním seskupeným průchodem (bez smyček po hráčích).
+    Základ = poslední hodnota před začátkem okna, jinak první hodnota v okně.
+    Vrací player, base, last, diff, pct – jen hráči se zápisem v okně; None = žádná data.
+    """
+    df = _frame("power", path, version)
+    if df.empty:
+        return None
+    if unit == "total":
+        values = df[["tank", "rocket", "air"]].astype(float).sum(axis=1, min_count=3)
+    else:
+        values = df[unit].astype(float)
+    d = pd.DataFrame({"player": df["player"], "timestamp": df["timestamp"], "v": values}).dropna(subset=["v"])
+    d = d.sort_values(["player", "timestamp"], kind="stable")
+    start = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)
+
+    in_window = d["timestamp"] >= start
+    g_all = d.groupby("player", observed=True, sort=False)["v"]
+    last = g_all.last()
+    before = d[~in_window].groupby("player", observed=True, sort=False)["v"].last()
+    first_in = d[in_window].groupby("player", observed=True, sort=False)["v"].first()
+
+    out = pd.DataFrame({"last": last[last.index.isin(first_in.index)]})
+    out["base"] = before.reindex(out.index).fillna(first_in.reindex(out.index))
+    out["diff"] = out["last"] - out["base"]
+    out["pct"] = (out["diff"] / out["base"].where(out["base"] != 0) * 100.0)
+    out = out.reset_index()
+    out["player"] = out["player"].astype(str)
+    return out
+
+
+def storm_split(path: str, version: Optional[str], selected: List[str], k: int):
+    """
+    Rozdělení vybraných hráčů: 2 nejsilnější útočí, dalších k jsou kapitáni,
+    zbytek greedy do týmu s nejnižší silou. None = málo hráčů.
+    Vrací ([útočník1, útočník2], [(kapitán, síla, [členové]), ...]).
+    """
+    df = _frame("power", path, version)
+    picked = df[df["player"].isin(selected)].sort_values("timestamp").groupby("player", observed=True).tail(1)
+    picked = picked.assign(total=picked[["tank", "rocket", "air"]].fillna(0.0).sum(axis=1).astype(float))
+    if len(picked) < k + 2:
+        return None
+    picked = picked.sort_values("total", ascending=False).reset_index(drop=True)
+    names = picked["player"].astype(str).tolist()
+    totals = picked["total"].tolist()
+
+    attackers = names[:2]
+    teams = [[names[2 + i], totals[2 + i], []] for i in range(k)]   # name, power, members
+    for name, total in zip(names[2 + k:], totals[2 + k:]):
+        idx = min(range(len(teams)), key=lambda i: teams[i][1])
+        teams[idx][1] += total
+        teams[idx][2].append(name)
+    return attackers, [tuple(t) for t in teams]
+
+
+def vs_top_by_tag(path: str, version: Optional[str], tag: str, n: int = 10) -> pd.DataFrame:
+    df = _frame("vs", path, version)
+    df_tag = df[df["tag"] == tag]
+    top = df_tag.groupby("name", observed=True)["points"].sum().reset_index()
+    top = top.sort_values(by="points", ascending=False).head(n)
+    top["name"] = top["name"].astype(str)
+    return top
+
+
+def vs_top_latest_day(path: str, version: Optional[str], n: int = 10) -> Tuple[Optional[str], pd.DataFrame]:
+    df = _frame("vs", path, version)
+    if df.empty:
+        return None, pd.DataFrame(columns=["name", "points"])
+    latest = df["date"].max()
+    df_day = df[df["date"] == latest]
+    top = df_day.groupby("name", observed=True)["points"].sum().reset_index()
+    top = top.sort_values(by="points", ascending=False).head(n)
+    top["name"] = top["name"].astype(str)
+    return str(latest), top
+
+
+def _parse_dates(values: pd.Index) -> pd.DatetimeIndex:
+    # VS datum je text: ISO (YYYY-MM-DD), starší zápisy i d.m.yy
+    iso = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    other = pd.to_datetime(values, format="mixed", dayfirst=True, errors="coerce")
+    return pd.DatetimeIndex(iso.where(~iso.isna(), other))
+
+
+def power_vs_efficiency(power_path: str, power_version: Optional[str], vs_path: str, vs_version: Optional[str],
+                        days: Optional[int]) -> pd.DataFrame:
+    """
+    Spojí poslední power (tank+rocket+air) každého hráče s jeho VS body za posledních `days` dní
+    (None = vše) přes sdílený casefold index jmen; řadí podle bodů na jednotku power.
+    Sloupce: player, total, points, vs_days, ratio.
+    """
+    p = _frame("power", power_path, power_version)
+    v = _frame("vs", vs_path, vs_version)
+    cols = ["player", "total", "points", "vs_days", "ratio"]
+    if p.empty or v.empty:
+        return pd.DataFrame(columns=cols)
+
+    # poslední zápis každého hráče (klíč, pak čas)
+    p_ids = name_ids(p, "player")
+    ts = pd.DatetimeIndex(p["timestamp"]).asi8
+    order = np.lexsort((ts, p_ids))
+    sorted_ids = p_ids[order]
+    last = order[np.r_[sorted_ids[1:] != sorted_ids[:-1], True]]
+    totals = np.nan_to_num(p[["tank", "rocket", "air"]].to_numpy(dtype=float)[last]).sum(axis=1)
+    latest = pd.DataFrame({"key": p_ids[last], "player": p["player"].astype(str).to_numpy()[last], "total": totals})
+    latest = latest[latest["key"] >= 0]
+
+    # VS body v okně (datum se parsuje jen po kategoriích)
+    v_ids = name_ids(v, "name")
+    dates = v["date"] if isinstance(v["date"].dtype, pd.CategoricalDtype) else v["date"].astype("category")
+    date_codes = dates.cat.codes.to_numpy()
+    keep = v_ids >= 0
+    if days:
+        cat_dates = _parse_dates(pd.Index(dates.cat.categories.astype(str)))
+        cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+        in_window = np.append(np.asarray(cat_dates >= cutoff, dtype=bool), False)   # kód -1 -> poslední prvek = False
+        keep &= in_window[date_codes]
+    vs = pd.DataFrame({"key": v_ids[keep], "date": date_codes[keep], "points": v["points"].to_numpy()[keep]})
+    agg = vs.groupby("key").agg(points=("points", "sum"), vs_days=("date", "nunique")).reset_index()
+
+    out = latest.merge(agg, on="key", how="inner")
+    out = out[out["total"] > 0]
+    out["ratio"] = out["points"] / out["total"]
+    return out.sort_values("ratio", ascending=False).reset_index(drop=True)[cols]
+
+
+# ----- API pro korutiny -----
+def start(paths: List[Tuple[str, str]]) -> None:
+    """Založí pool a nahřeje workery (načtou snapshoty), ať první dotaz nečeká na start procesu."""
+    global _POOL
+    if _POOL is not None or ANALYTICS_WORKERS <= 0:
+        return
+    # spawn: bez forku procesu s běžícím event loopem a vlákny
+    ctx = multiprocessing.get_context("spawn")
+    _POOL = ProcessPoolExecutor(max_workers=ANALYTICS_WORKERS, mp_context=ctx)
+    for _ in range(ANALYTICS_WORKERS):
+        _POOL.submit(_warm_up, paths)
+
+
+def shutdown() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+async def run(fn, *args):
+    """Spustí výpočet ve workeru (nebo ve vlákně, když pool není) a vrátí výsledek."""
+    if _POOL is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(_POOL, fn, *args)
@@ -0,0 +1,421 @@
+# data_store.py
+# ------------------------------------------------------------
+# Lokální úložiště dat (power + VS).
+#   - CSV zůstává výměnným formátem (GitHub, ruční úpravy)
+#   - vedle CSV držíme sloupcový snapshot "<soubor>.snap/":
+#       current.json            která verze odpovídá CSV (sha1 obsahu) + jeho stat
+#       <verze>/meta.json       popis sloupců
+#       <verze>/<sloupec>.npy   jeden typovaný sloupec (řetězce jako kódy kategorií)
+#       <verze>/offsets.npy     index offsetů po hráčích (řádky seřazené podle hráče)
+#   - adresář verze se skládá v dočasném adresáři a na místo se přejmenuje celý
+#     -> souběžní zapisovači (vlákna i workery analytics) nikdy nesmíchají sloupce dvou verzí
+#   - snapshot se načítá přes mmap -> start bez dekódování a parsování textu
+#   - v paměti držíme jeden DataFrame na soubor, dokud se CSV nezmění
+# ------------------------------------------------------------
+
+import os
+import io
+import csv
+import json
+import shutil
+import tempfile
+import hashlib
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+POWER_HEADER = ["player", "tank", "rocket", "air", "team4", "timestamp"]  # pevné pořadí
+VS_HEADER = ["name", "points", "date", "tag"]
+
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_FORMAT = 3
+SNAPSHOT_KEEP = 2          # kolik verzí snapshotu nechat na disku (aktuální + předchozí pro rozečtené mmapy)
+_SEP_TABLE = bytes.maketrans(b"\t;", b",,")
+
+# path -> (stat, version, df, offsets)
+_FRAMES: Dict[str, Tuple[Tuple[int, int], str, pd.DataFrame, Optional[np.ndarray]]] = {}
+
+
+# ====== CSV ======
+def ensure_csv(path: str, header: List[str]) -> None:
+    need = False
+    if not os.path.exists(path):
+        need = True
+    else:
+        try:
+            if os.path.getsize(path) == 0:
+                need = True
+            else:
+                _ = pd.read_csv(path, sep=None, engine="python")
+        except Exception:
+            need = True
+    if need:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(header)
+
+
+def _file_stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def file_version(path: str) -> str:
+    """Verze dat = sha1 obsahu souboru (čtení bez parsování)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_power_csv(src: Union[str, bytes], drop_invalid: bool = True) -> pd.DataFrame:
+    """
+    Robustní načtení CSV přímo do kompaktního DataFrame:
+    - oddělovače TAB/; se v bytech přepíšou na čárku (jedna kopie, žádný text/řádky/StringIO)
+    - NEkolabuje prázdná pole: zachová dvojité čárky ,, i prázdná team4
+    - bere přesně 6 sloupců v pořadí POWER_HEADER (kratší řádky doplní, delší ořízne)
+    - player jako kategorie, jednotky jako float32, timestamp jako datetime64 (UTC, ISO i s T i s mezerou)
+    - drop_invalid=False: řádky s nečitelným časem zůstanou (NaT) -> řádek df = řádek souboru
+    """
+    if isinstance(src, (bytes, bytearray)):
+        raw = bytes(src).translate(_SEP_TABLE)
+    else:
+        with open(src, "rb") as f:
+            raw = f.read().translate(_SEP_TABLE)
+
+    # hlavička? (první neprázdný řádek obsahuje "player")
+    first = raw.lstrip(b"\xef\xbb\xbf \r\n").split(b"\n", 1)[0]
+    has_header = any(tok.strip().lower() == b"player" for tok in first.split(b","))
+
+    df = pd.read_csv(
+        io.BytesIO(raw), header=None, names=POWER_HEADER, usecols=range(len(POWER_HEADER)),
+        skiprows=1 if has_header else 0, skipinitialspace=True,
+        dtype={"player": "category", "timestamp": str},
+        encoding="utf-8", encoding_errors="ignore",
+    )
+    del raw
+
+    players = df["player"].cat.categories
+    stripped = players.astype(str).str.strip()
+    if stripped.is_unique:
+        df["player"] = df["player"].cat.rename_categories(stripped)
+    else:
+        df["player"] = df["player"].astype(str).str.strip().astype("category")
+
+    for c in ["tank", "rocket", "air", "team4"]:
+        col = df[c]
+        if not pd.api.types.is_float_dtype(col.dtype):
+            col = pd.to_numeric(col, errors="coerce")
+        df[c] = col.astype(np.float32)
+
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True, format="ISO8601")
+    ok = df["timestamp"].notna()
+    if drop_invalid and not ok.all():
+        df = df.loc[ok].reset_index(drop=True)
+    return df
+
+
+def split_power_lines(content: bytes) -> Tuple[Optional[bytes], List[bytes]]:
+    """(řádek hlavičky nebo None, neprázdné datové řádky) – syrové bajty, beze změny formátu."""
+    lines = [ln for ln in content.split(b"\n") if ln.strip()]
+    if lines:
+        first = lines[0].lstrip(b"\xef\xbb\xbf ").translate(_SEP_TABLE)
+        if any(tok.strip().lower() == b"player" for tok in first.split(b",")):
+            return lines[0], lines[1:]
+    return None, lines
+
+
+def _parse_vs_csv(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    for c in VS_HEADER:
+        if c not in df.columns:
+            df[c] = None
+    df = df[VS_HEADER]
+    df["name"] = df["name"].astype(str).str.strip()
+    df["points"] = pd.to_numeric(df["points"], errors="coerce").fillna(0).astype("int64")
+    return df
+
+
+def _format_units(values: pd.Series) -> List[str]:
+    # nejkratší zápis, který přesně odpovídá float32 (bez 1.2e+06 a bez 10.199999809)
+    return ["" if np.isnan(v) else np.format_float_positional(v, trim="0") for v in values.to_numpy()]
+
+
+def power_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Serializuje power DataFrame do CSV ve formátu, který zapisuje /powerenter."""
+    out = pd.DataFrame({"player": df["player"].astype(str)})
+    for c in ["tank", "rocket", "air", "team4"]:
+        out[c] = _format_units(df[c])
+    out["timestamp"] = df["timestamp"].dt.tz_convert("UTC").dt.strftime("%Y-%m-%d %H:%M:%S.%f+00:00")
+    return out[POWER_HEADER].to_csv(index=False, lineterminator="\n").encode("utf-8")
+
+
+def write_atomic(path: str, content: bytes) -> None:
+    """Zapíše soubor přes dočasný soubor + rename (čtenář nikdy nevidí půlku)."""
+    # unikátní temp ve stejném adresáři: souběžné zápisy si ho nepřepíšou, rename je atomický
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+# ====== SNAPSHOT ======
+def _snapshot_dir(path: str) -> str:
+    return os.path.splitext(path)[0] + SNAPSHOT_SUFFIX
+
+
+def _version_dir(path: str, version: str) -> str:
+    return os.path.join(_snapshot_dir(path), version)
+
+
+def _pointer_path(path: str) -> str:
+    return os.path.join(_snapshot_dir(path), "current.json")
+
+
+def _to_columnar(df: pd.DataFrame, key: str, order_by: str) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Převede textové sloupce na seřazené kategorie a seřadí řádky podle klíče (hráče)."""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype) or s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.cat.remove_unused_categories()
+                s = s.cat.reorder_categories(sorted(s.cat.categories), ordered=True)
+            else:
+                s = s.astype(pd.CategoricalDtype(ordered=True))  # kategorie se seřadí samy
+        out[c] = s
+    typed = pd.DataFrame(out, columns=df.columns)
+    typed = typed.sort_values([key, order_by], kind="stable", na_position="first").reset_index(drop=True)
+    codes = typed[key].cat.codes.to_numpy()
+    n_cats = len(typed[key].cat.categories)
+    offsets = np.searchsorted(codes, np.arange(n_cats + 1), side="left").astype(np.int64)
+    return typed, offsets
+
+
+def _write_snapshot(path: str, df: pd.DataFrame, offsets: np.ndarray, version: str, stat: Tuple[int, int]) -> None:
+    snap = _snapshot_dir(path)
+    os.makedirs(snap, exist_ok=True)
+    final = _version_dir(path, version)
+    if not os.path.exists(os.path.join(final, "meta.json")):
+        # celá verze vznikne v dočasném adresáři; na místo jde jedním rename
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=snap)
+        try:
+            columns = []
+            for c in df.columns:
+                s = df[c]
+                col = {"name": c}
+                if isinstance(s.dtype, pd.CategoricalDtype):
+                    col["kind"] = "cat"
+                    col["categories"] = [str(x) for x in s.cat.categories]
+                    arr = s.cat.codes.to_numpy().astype(np.int32)
+                elif isinstance(s.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(s.dtype):
+                    col["kind"] = "dt"
+                    col["tz"] = str(s.dt.tz) if s.dt.tz is not None else None
+                    col["unit"] = s.dt.unit
+                    arr = s.array.asi8  # epoch (UTC) v jednotkách sloupce
+                else:
+                    col["kind"] = "num"
+                    arr = s.to_numpy()
+                np.save(os.path.join(tmp, f"{c}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+                columns.append(col)
+            np.save(os.path.join(tmp, "offsets.npy"), offsets, allow_pickle=False)
+            meta = {"format": SNAPSHOT_FORMAT, "version": version, "rows": int(len(df)), "columns": columns}
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            try:
+                os.replace(tmp, final)
+            except OSError:
+                # stejnou verzi mezitím dopsal jiný zapisovač – jeho adresář je stejně dobrý
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    _write_pointer(path, version, stat)
+    _prune_snapshots(path, version)
+
+
+def _write_pointer(path: str, version: str, stat: Tuple[int, int]) -> None:
+    ptr = {"format": SNAPSHOT_FORMAT, "version": version, "stat": list(stat)}
+    write_atomic(_pointer_path(path), json.dumps(ptr).encode("utf-8"))
+
+
+def _prune_snapshots(path: str, keep_version: str) -> None:
+    """Smaže staré verze (a zbytky formátu 2); nechá aktuální + SNAPSHOT_KEEP-1 nejnovějších."""
+    snap = _snapshot_dir(path)
+    versions = []
+    for name in os.listdir(snap):
+        full = os.path.join(snap, name)
+        if name == "current.json" or name == keep_version:
+            continue
+        if name.startswith(".tmp-"):
+            # rozpracovaný zápis jiného zapisovače; mažeme jen zbytky po pádu
+            try:
+                if os.path.getmtime(full) < os.path.getmtime(_pointer_path(path)) - 3600:
+                    shutil.rmtree(full, ignore_errors=True)
+            except OSError:
+                pass
+        elif os.path.isdir(full):
+            versions.append((os.path.getmtime(full), full))
+        else:
+            try:
+                os.remove(full)   # soubory starého formátu přímo v .snap/
+            except OSError:
+                pass
+    # odmapované soubory smazat nevadí (inode žije, dokud je někdo má namapované)
+    for _, full in sorted(versions, reverse=True)[SNAPSHOT_KEEP - 1:]:
+        shutil.rmtree(full, ignore_errors=True)
+
+
+def _read_pointer(path: str) -> Optional[dict]:
+    try:
+        with open(_pointer_path(path), encoding="utf-8") as f:
+            ptr = json.load(f)
+        return ptr if ptr.get("format") == SNAPSHOT_FORMAT else None
+    except (OSError, ValueError):
+        return None
+
+
+def _read_snapshot_meta(path: str, version: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(_version_dir(path, version), "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta if meta.get("format") == SNAPSHOT_FORMAT and meta.get("version") == version else None
+    except (OSError, ValueError):
+        return None
+
+
+def _load_snapshot(path: str, meta: dict) -> Optional[Tuple[pd.DataFrame, np.ndarray]]:
+    snap = _version_dir(path, meta["version"])
+    try:
+        data = {}
+        for col in meta["columns"]:
+            arr = np.load(os.path.join(snap, f"{col['name']}.npy"), mmap_mode="r")
+            if len(arr) != meta["rows"]:
+                return None
+            if col["kind"] == "cat":
+                dtype = pd.CategoricalDtype(col["categories"], ordered=True)
+                data[col["name"]] = pd.Categorical.from_codes(arr, dtype=dtype)
+            elif col["kind"] == "dt":
+                ts = pd.DatetimeIndex(arr.view(f"datetime64[{col.get('unit', 'ns')}]"))
+                data[col["name"]] = ts.tz_localize("UTC").tz_convert(col["tz"]) if col.get("tz") else ts
+            else:
+                data[col["name"]] = arr
+        offsets = np.load(os.path.join(snap, "offsets.npy"), mmap_mode="r")
+        df = pd.DataFrame(data, columns=[c["name"] for c in meta["columns"]], copy=False)
+        return df, offsets
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[snapshot] load failed for {path}: {e}")
+        return None
+
+
+def _load_frame(path: str, header: List[str], parser, key: str, order_by: str) -> Tuple[pd.DataFrame, np.ndarray, str]:
+    """Vrátí (df, offsets, version). Pořadí: paměť -> snapshot -> parsování CSV (+ nový snapshot)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        ensure_csv(path, header)
+    stat = _file_stat(path)
+
+    cached = _FRAMES.get(path)
+    if cached and cached[0] == stat:
+        return cached[2], cached[3], cached[1]
+
+    ptr = _read_pointer(path)
+    if ptr and tuple(ptr.get("stat", ())) == stat:
+        version = ptr["version"]
+    else:
+        version = file_version(path)
+
+    meta = _read_snapshot_meta(path, version)
+    loaded = _load_snapshot(path, meta) if meta else None
+    if loaded is not None:
+        df, offsets = loaded
+        if not ptr or ptr.get("version") != version or tuple(ptr.get("stat", ())) != stat:
+            # stejný obsah, jen nový mtime (např. znovu stažený soubor) – aktualizuj ukazatel
+            _write_pointer(path, version, stat)
+    else:
+        df, offsets = _to_columnar(parser(path), key, order_by)
+        try:
+            _write_snapshot(path, df, offsets, version, stat)
+        except OSError as e:
+            print(f"[snapshot] write failed for {path}: {e}")
+
+    _FRAMES[path] = (stat, version, df, offsets)
+    return df, offsets, version
+
+
+# ====== VEŘEJNÉ API ======
+def load_power_df(path: str) -> pd.DataFrame:
+    """Power data seřazená podle (player, timestamp); player je seřazená kategorie, jednotky float32."""
+    df, _, _ = _load_frame(path, POWER_HEADER, parse_power_csv, "player", "timestamp")
+    return df.copy(deep=False)
+
+
+def load_vs_df(path: str) -> pd.DataFrame:
+    """VS data seřazená podle (name, date); textové sloupce jsou seřazené kategorie."""
+    df, _, _ = _load_frame(path, VS_HEADER, _parse_vs_csv, "name", "date")
+    return df.copy(deep=False)
+
+
+def data_version(path: str) -> Optional[str]:
+    """
+    Verze (sha1 obsahu) aktuálního stavu souboru, bez načítání dat:
+    paměť -> ukazatel snapshotu (podle statu) -> hash souboru. None = soubor neexistuje.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = _file_stat(path)
+    cached = _FRAMES.get(path)
+    if cached and cached[0] == stat:
+        return cached[1]
+    ptr = _read_pointer(path)
+    if ptr and tuple(ptr.get("stat", ())) == stat:
+        return ptr["version"]
+    return file_version(path)
+
+
+def evict(path: str) -> None:
+    """Zapomene DataFrame souboru v paměti (snapshot na disku zůstává)."""
+    _FRAMES.pop(path, None)
+
+
+def loaded_versions() -> Dict[str, Dict[str, object]]:
+    """Co je právě v paměti: cesta -> verze a počet řádků (pro /healthz)."""
+    return {path: {"version": version, "rows": int(len(df))} for path, (_, version, df, _) in _FRAMES.items()}
+
+
+# ====== SDÍLENÝ INDEX JMEN ======
+# casefold jméno -> id, společné pro power (player) i VS (name) = klíč pro spojení obou zdrojů
+_NAME_IDS: Dict[str, int] = {}
+
+
+def name_key(name) -> str:
+    return str(name).strip().casefold()
+
+
+def name_ids(df: pd.DataFrame, col: str) -> np.ndarray:
+    """
+    Id ze sdíleného indexu jmen pro každý řádek (-1 = chybí jméno).
+    Normalizují se jen kategorie (stovky jmen), řádky se jen přemapují přes kódy.
+    """
+    s = df[col]
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    cat_ids = np.array([_NAME_IDS.setdefault(name_key(c), len(_NAME_IDS)) for c in s.cat.categories], dtype=np.int64)
+    codes = s.cat.codes.to_numpy()
+    if not len(cat_ids):
+        return np.full(len(codes), -1, dtype=np.int64)
+    return np.where(codes >= 0, cat_ids[codes], -1)
+
+
+def power_player_rows(path: str, player: str) -> pd.DataFrame:
+    """Řádky jednoho hráče (bez ohledu na velikost písmen) přes index offsetů – bez skenu celé tabulky."""
+    df, offsets, _ = _load_frame(path, POWER_HEADER, parse_power_csv, "player", "timestamp")
+    q = str(player).strip().casefold()
+    cats = df["player"].cat.categories
+    codes = [i for i, name in enumerate(cats) if name.casefold() == q]
+    if not codes:
+        return df.iloc[0:0].copy()
+    parts = [df.iloc[int(offsets[i]):int(offsets[i + 1])] for i in codes]
+    out = parts[0] if len(parts) == 1 else pd.concat(parts).sort_values("timestamp", kind="stable")
+    return out.copy()
@@ -0,0 +1,150 @@
+# dispatcher.py
+# ------------------------------------------------------------
+# Centrální odesílání zpráv na Discord.
+#   - řádky pro stejný kanál se skládají do co nejmenšího počtu zpráv (limit délky)
+#   - na každý kanál vlastní fronta + worker; kanály běží paralelně
+#   - proaktivní token bucket na kanál (Discord: ~5 zpráv / 5 s), takže se
+#     nenaráží na 429 a discord.py nemusí retryovat
+#   - volající dostane future (seznam odeslaných zpráv); chyby se logují
+# ------------------------------------------------------------
+
+import time
+import asyncio
+from typing import Any, Dict, List, NamedTuple, Optional
+
+MAX_MESSAGE = 1900   # rezerva pod limitem 2000 znaků
+IDLE_TIMEOUT = 60.0  # po kolika s nečinnosti se worker kanálu ukončí
+
+
+class _Out(NamedTuple):
+    text: str
+    future: asyncio.Future
+
+
+class _Bucket:
+    """Token bucket: `rate` zpráv za `per` sekund."""
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+
+
+def pack_lines(lines: List[str], header: str = "", limit: int = MAX_MESSAGE) -> List[str]:
+    """Složí řádky do co nejméně zpráv do `limit` znaků (příliš dlouhý řádek se rozdělí)."""
+    chunks: List[str] = []
+    chunk = (header + "\n") if header else ""
+    for line in lines:
+        while len(line) > limit:
+            if chunk.strip():
+                chunks.append(chunk.rstrip()); chunk = ""
+            chunks.append(line[:limit]); line = line[limit:]
+        if len(chunk) + len(line) + 1 > limit and chunk.strip():
+            chunks.append(chunk.rstrip())
+            chunk = ""
+        chunk += line + "\n"
+    if chunk.strip():
+        chunks.append(chunk.rstrip())
+    return chunks
+
+
+class OutboundDispatcher:
+    def __init__(self, rate: int = 5, per: float = 5.0, limit: int = MAX_MESSAGE):
+        self.rate = rate
+        self.per = per
+        self.limit = limit
+        self._queues: Dict[Any, "asyncio.Queue[_Out]"] = {}
+        self._targets: Dict[Any, Any] = {}
+        self._buckets: Dict[Any, _Bucket] = {}
+        self._workers: Dict[Any, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(target: Any) -> Any:
+        # followup webhook = token interakce (id webhooku je společné id aplikace), jinak id kanálu
+        token = getattr(target, "token", None)
+        if token:
+            return ("webhook", token)
+        return ("channel", getattr(target, "id", None) or id(target))
+
+    def send_lines(self, target: Any, lines: List[str], header: str = "") -> "asyncio.Future[List[Any]]":
+        """Zařadí řádky do fronty kanálu; future vrátí odeslané zprávy."""
+        loop = asyncio.get_running_loop()
+        key = self._key(target)
+        q = self._queues.get(key)
+        if q is None:
+            q = self._queues[key] = asyncio.Queue()
+            self._buckets[key] = _Bucket(self.rate, self.per)
+        self._targets[key] = target
+        if key not in self._workers or self._workers[key].done():
+            self._workers[key] = loop.create_task(self._worker(key), name=f"dispatch:{key}")
+
+        chunks = pack_lines(lines, header, self.limit)
+        futs = []
+        for text in chunks:
+            fut = loop.create_future()
+            q.put_nowait(_Out(text, fut))
+            futs.append(fut)
+        done = asyncio.gather(*futs) if futs else loop.create_future()
+        if not futs:
+            done.set_result([])
+        done.add_done_callback(self._log_failure)
+        return done
+
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues.values())
+
+    @staticmethod
+    def _log_failure(fut: asyncio.Future) -> None:
+        if not fut.cancelled() and fut.exception():
+            print(f"[dispatch] send failed: {fut.exception()}")
+
+    async def _worker(self, key: Any) -> None:
+        q = self._queues[key]
+        bucket = self._buckets[key]
+        carry: Optional[_Out] = None
+        while True:
+            if carry is None:
+                try:
+                    carry = await asyncio.wait_for(q.get(), timeout=IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    if not q.empty():
+                        continue   # send_lines přidal zprávu ve stejném ticku jako timeout
+                    # nečinný kanál: uklidit (další send_lines založí nový worker);
+                    # od kontroly výše až po return se nečeká -> nic nového se do fronty nedostane
+                    for d in (self._queues, self._buckets, self._targets, self._workers):
+                        d.pop(key, None)
+                    return
+            # co čeká ve frontě a vejde se, slepíme do jedné zprávy
+            batch, carry = [carry], None
+            size = len(batch[0].text)
+            while not q.empty():
+                nxt = q.get_nowait()
+                if size + 1 + len(nxt.text) > self.limit:
+                    carry = nxt
+                    break
+                batch.append(nxt)
+                size += 1 + len(nxt.text)
+            try:
+                await bucket.acquire()
+                msg = await self._targets[key].send("\n".join(o.text for o in batch))
+                for o in batch:
+                    if not o.future.done():
+                        o.future.set_result(msg)
+            except Exception as e:
+                for o in batch:
+                    if not o.future.done():
+                        o.future.set_exception(e)
+
+
+dispatcher = OutboundDispatcher()
@@ -1,7 +1,20 @@
 import os
+import re
+import gzip
+import zlib
+import json
+import tempfile
 import base64
+import time
+import hashlib
+import posixpath
 import requests
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard   # volitelné – jen pro GH_COMPRESS=zstd / soubory *.zst
+except ImportError:
+    zstandard = None
 
 GH_OWNER  = os.getenv("GH_OWNER", "stepanekmi")
 GH_REPO   = os.getenv("GH_REPO",  "vs-data-store")
@@ -24,53 +37,252 @@ def _raw_url(path: str) -> str:
     return f"https://raw.githubusercontent.com/{GH_OWNER}/{GH_REPO}/{GH_BRANCH}/{path}"
 
 
+def _git_url(path: str) -> str:
+    return f"https://api.github.com/repos/{GH_OWNER}/{GH_REPO}/git/{path}"
+
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA, pod kterou git (a GitHub) ukládá daný obsah souboru."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _write_atomic(local_file_path: str, content: bytes) -> int:
+    return _write_atomic_chunks(local_file_path, [content])
+
+
+def _write_atomic_chunks(local_file_path: str, chunks: Iterable[bytes], allow_empty: bool = True) -> int:
+    """
+    Zapíše proud bloků do souboru atomicky (temp + rename). Vrací počet zapsaných bajtů.
+    allow_empty=False: prázdný proud lokální soubor nepřepíše (vrací 0).
+    """
+    # unikátní temp ve stejném adresáři: souběžné zápisy si ho nepřepíšou, rename je atomický
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(local_file_path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(local_file_path)))
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        if not written and not allow_empty:
+            os.remove(tmp)
+            return 0
+        os.replace(tmp, local_file_path)
+    except BaseException:
+        # přerušené stažení nesmí nechat napůl zapsaný soubor ani temp
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return written
+
+
+def _iter_blob(sha: str) -> Iterator[bytes]:
+    """Obsah blobu po blocích – raw media type (bez base64 v JSON, žádná +33 % režie)."""
+    r = session.get(_git_url(f"blobs/{sha}"), headers={"Accept": "application/vnd.github.raw+json"},
+                    stream=True, timeout=30)
+    with r:   # i chybová odpověď musí vrátit spojení do poolu
+        r.raise_for_status()
+        yield from r.iter_content(_CHUNK)
+
+
+def _get_blob(sha: str) -> bytes:
+    return b"".join(_iter_blob(sha))
+
+
+# ====== KOMPRESE ======
+# Datové soubory mohou v repu ležet komprimované: data/power_data.csv.gz / .csv.zst
+# (u shardů <měsíc>.csv.gz + "compression" v manifestu). Lokálně je vždy čisté CSV.
+#   - formát se pozná podle přípony (shardy: cesta v manifestu), ne podle konfigurace
+#     -> čtení funguje i po změně GH_COMPRESS
+#   - stažení se dekomprimuje po blocích rovnou do lokálního souboru (bez celé kopie v paměti)
+#   - gzip s mtime=0 je deterministický: stejné CSV = stejný blob SHA -> "nezměněno"
+#     se pozná bez stahování i u komprimovaných souborů
+GH_COMPRESS = os.getenv("GH_COMPRESS", "none")   # "none" | "gzip" | "zstd" – jak ukládat commity
+_EXT = {"gzip": ".gz", "zstd": ".zst"}
+_CHUNK = 1 << 16
+# chyby rozbalení (poškozený / useknutý soubor, chybějící zstandard)
+_DECODE_ERRORS = (zlib.error, ValueError) + ((zstandard.ZstdError,) if zstandard else ())
+_STORED_SHA: Dict[Tuple[str, Optional[str]], Tuple[Tuple[int, int], str]] = {}
+
+
+def _write_codec() -> Optional[str]:
+    codec = GH_COMPRESS.strip().lower()
+    if codec == "zstd" and zstandard is None:
+        print("⚠️ GH_COMPRESS=zstd, ale chybí balík zstandard — ukládám gzip")
+        return "gzip"
+    return codec if codec in _EXT else None
+
+
+def _read_codecs() -> List[Optional[str]]:
+    """Varianty souboru v pořadí preference (nejdřív ta, do které se ukládá)."""
+    order = [_write_codec(), None, "gzip", "zstd"]
+    out: List[Optional[str]] = []
+    for c in order:
+        if c not in out and (c != "zstd" or zstandard is not None):
+            out.append(c)
+    return out
+
+
+def codec_of(repo_file_path: str) -> Optional[str]:
+    """Komprese podle přípony ("gzip" / "zstd" / None)."""
+    for codec, ext in _EXT.items():
+        if repo_file_path.endswith(ext):
+            return codec
+    return None
+
+
+def _variant_path(repo_file_path: str, codec: Optional[str]) -> str:
+    return repo_file_path + _EXT.get(codec, "")
+
+
+def _compress(data: bytes, codec: Optional[str]) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return data
+
+
+def compress_for_repo(repo_file_path: str, data: bytes) -> Tuple[str, bytes]:
+    """(cesta s příponou, obsah) souboru v kompresi GH_COMPRESS – např. pro archivy přikládané do commitu."""
+    codec = _write_codec()
+    return _variant_path(repo_file_path, codec), _compress(data, codec)
+
+
+def _decode_stream(chunks: Iterable[bytes], codec: Optional[str]) -> Iterator[bytes]:
+    """Dekomprimuje proud bloků průběžně (gzip přes zlib, zstd přes zstandard)."""
+    if codec is None:
+        yield from chunks
+        return
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("soubor .zst, ale chybí balík zstandard")
+        d = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        d = zlib.decompressobj(16 + zlib.MAX_WBITS)   # gzip hlavička
+    for chunk in chunks:
+        out = d.decompress(chunk)
+        if out:
+            yield out
+    tail = d.flush()
+    if tail:
+        yield tail
+    if not d.eof:
+        # useknuté stažení nesmí projít jako kratší CSV (merge-up by ho pak commitnul)
+        raise (zlib.error if codec == "gzip" else ValueError)(f"{codec} stream truncated")
+
+
+def _decompress(data: bytes, codec: Optional[str]) -> bytes:
+    return b"".join(_decode_stream([data], codec))
+
+
+def stored_blob_sha(local_file_path: str, codec: Optional[str]) -> Optional[str]:
+    """
+    Blob SHA lokálního souboru tak, jak by ležel v repu (po kompresi `codec`).
+    Kešováno podle (mtime, velikost) – merge-up před každým zápisem nekomprimuje znovu.
+    """
+    if codec is None:
+        return local_blob_sha(local_file_path)
+    try:
+        st = os.stat(local_file_path)
+    except FileNotFoundError:
+        return None
+    stat = (st.st_mtime_ns, st.st_size)
+    hit = _STORED_SHA.get((local_file_path, codec))
+    if hit and hit[0] == stat:
+        return hit[1]
+    with open(local_file_path, "rb") as f:
+        sha = git_blob_sha(_compress(f.read(), codec))
+    _STORED_SHA[(local_file_path, codec)] = (stat, sha)
+    return sha
+
+
 def fetch_from_repo(repo_file_path: str, local_file_path: str, prefer_api: bool = True) -> bool:
     """
     Stáhne repo soubor do local_file_path.
-    Preferuje GitHub Contents API (bez CDN cache). RAW je fallback.
+    Nejdřív porovná git blob SHA lokálního souboru se SHA v repu (výpis adresáře, bez obsahu)
+    – stejný obsah se vůbec nestahuje. Preferuje Git blob API (bez CDN cache, i nad 1 MB).
+    RAW je fallback. Komprimovaná varianta v repu (<soubor>.gz / .zst) se najde sama
+    a rozbalí se při stahování.
     """
     # 1) API (bez cache)
     if prefer_api:
         try:
-            r = session.get(_api_url(repo_file_path), params={"ref": GH_BRANCH}, timeout=20)
-            if r.status_code == 200:
-                data = r.json()
-                content_b64 = data.get("content")
-                if content_b64:
-                    content = base64.b64decode(content_b64)
-                    with open(local_file_path, "wb") as f:
-                        f.write(content)
-                    print(f"✅ API fetched {repo_file_path} -> {local_file_path} ({len(content)} B)")
-                    return True
-                else:
-                    print(f"⚠️ API fetch: no content for {repo_file_path}")
+            path, remote_sha, _ = remote_variant(repo_file_path)
+            codec = codec_of(path)
+            if remote_sha and remote_sha == stored_blob_sha(local_file_path, codec):
+                print(f"✅ {path} up to date (sha={remote_sha}) — skip download")
+                return True
+            if remote_sha:
+                size = _write_atomic_chunks(local_file_path, _decode_stream(_iter_blob(remote_sha), codec))
+                print(f"✅ API fetched {path} -> {local_file_path} ({size} B)")
+                return True
             else:
-                print(f"⚠️ API fetch {repo_file_path} status={r.status_code} body={r.text[:200]}")
-        except requests.RequestException as e:
+                print(f"⚠️ API fetch: {repo_file_path} not found")
+        except (requests.RequestException, *_DECODE_ERRORS) as e:
             print(f"⚠️ API fetch error {repo_file_path}: {e}")
 
     # 2) RAW (může být cache pár minut)
-    try:
-        r = session.get(_raw_url(repo_file_path), timeout=20)
-        if r.status_code == 200 and r.content:
-            with open(local_file_path, "wb") as f:
-                f.write(r.content)
-            print(f"ℹ️ RAW fetched {repo_file_path} -> {local_file_path} ({len(r.content)} B)")
-            return True
-        else:
-            print(f"ℹ️ RAW fetch {repo_file_path} status={r.status_code}")
-    except requests.RequestException as e:
-        print(f"ℹ️ RAW fetch error {repo_file_path}: {e}")
+    for codec in _read_codecs():
+        path = _variant_path(repo_file_path, codec)
+        try:
+            r = session.get(_raw_url(path), timeout=20, stream=True)
+            with r:
+                if r.status_code == 200:
+                    size = _write_atomic_chunks(local_file_path, _decode_stream(r.iter_content(_CHUNK), codec),
+                                                allow_empty=False)
+                    if size:
+                        print(f"ℹ️ RAW fetched {path} -> {local_file_path} ({size} B)")
+                        return True
+                print(f"ℹ️ RAW fetch {path} status={r.status_code}")
+        except (requests.RequestException, *_DECODE_ERRORS) as e:
+            print(f"ℹ️ RAW fetch error {path}: {e}")
 
     return False
 
 
+def local_blob_sha(local_file_path: str) -> Optional[str]:
+    """Git blob SHA lokálního souboru (None, když neexistuje)."""
+    if not os.path.exists(local_file_path):
+        return None
+    with open(local_file_path, "rb") as f:
+        return git_blob_sha(f.read())
+
+
+def _list_dir(parent: str) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+    """Soubory adresáře v repu: jméno -> (sha, size). Jeden request, bez obsahu."""
+    r = session.get(_api_url(parent), params={"ref": GH_BRANCH}, timeout=20)
+    if r.status_code != 200:
+        return {}
+    return {e["name"]: (e.get("sha"), e.get("size")) for e in r.json() if e.get("type") == "file"}
+
+
 def get_remote_meta(repo_file_path: str) -> Tuple[Optional[str], Optional[int]]:
-    r = session.get(_api_url(repo_file_path), params={"ref": GH_BRANCH}, timeout=20)
-    if r.status_code == 200:
-        j = r.json()
-        return j.get("sha"), j.get("size")
-    return None, None
+    """(sha, size) souboru v repu z výpisu nadřazeného adresáře – bez stahování obsahu."""
+    parent, name = posixpath.split(repo_file_path)
+    return _list_dir(parent).get(name, (None, None))
+
+
+def _remote_variants(repo_file_path: str) -> Dict[Optional[str], Tuple[Optional[str], Optional[int]]]:
+    """Které varianty souboru (bez komprese / gzip / zstd) v repu existují: codec -> (sha, size)."""
+    parent, name = posixpath.split(repo_file_path)
+    listing = _list_dir(parent)
+    return {c: listing[name + _EXT.get(c, "")] for c in (None, *_EXT) if name + _EXT.get(c, "") in listing}
+
+
+def remote_variant(repo_file_path: str) -> Tuple[str, Optional[str], Optional[int]]:
+    """(skutečná cesta, sha, size) souboru v repu – i když leží komprimovaný. sha None = není."""
+    found = _remote_variants(repo_file_path)
+    for codec in _read_codecs():
+        if codec in found:
+            return (_variant_path(repo_file_path, codec), *found[codec])
+    return repo_file_path, None, None
+
+
+def remote_in_sync(repo_file_path: str, local_file_path: str) -> bool:
+    """Shoduje se lokální soubor s repem (i přes kompresi)? Bez stahování obsahu."""
+    path, sha, _ = remote_variant(repo_file_path)
+    return bool(sha) and sha == stored_blob_sha(local_file_path, codec_of(path))
 
 
 def save_to_github(local_file_path: str, repo_file_path: str, message: str) -> Optional[str]:
@@ -102,3 +314,276 @@ def save_to_github(local_file_path: str, repo_file_path: str, message: str) -> O
         except Exception as e:
             print(f"❌ raise_for_status: {e}")
         return None
+
+
+# ====== SHARDOVANÝ LAYOUT ======
+# data/power_data.csv  ->  data/power_data/manifest.json + data/power_data/2025-05.csv, ...
+# Shard = jeden měsíc (podle posledního data YYYY-MM-DD na řádku), řádky bez data -> "misc".
+# Manifest drží hlavičku a blob SHA shardů; fetch i commit sahají jen na změněné shardy.
+# Commity jdou přes Git Data API (blobs/trees/commits/refs) -> víc souborů atomicky v jednom commitu.
+
+GH_LAYOUT = os.getenv("GH_LAYOUT", "file")   # "file" | "sharded"
+MANIFEST_NAME = "manifest.json"
+_DATE_RE = re.compile(rb"(\d{4})-(\d{2})-\d{2}")
+
+
+def _shard_dir(repo_file_path: str) -> str:
+    return posixpath.splitext(repo_file_path)[0]
+
+
+def _manifest_path(repo_file_path: str) -> str:
+    return posixpath.join(_shard_dir(repo_file_path), MANIFEST_NAME)
+
+
+def split_csv_shards(content: bytes) -> Tuple[bytes, Dict[str, bytes]]:
+    """Rozdělí CSV na (hlavička, {klíč shardu: řádky}). Klíč = YYYY-MM posledního data na řádku."""
+    lines = content.replace(b"\r\n", b"\n").split(b"\n")
+    header = lines[0] if lines else b""
+    shards: Dict[str, List[bytes]] = {}
+    for ln in lines[1:]:
+        if not ln.strip():
+            continue
+        found = _DATE_RE.findall(ln)
+        key = f"{found[-1][0].decode()}-{found[-1][1].decode()}" if found else "misc"
+        shards.setdefault(key, []).append(ln)
+    return header, {k: b"\n".join(v) + b"\n" for k, v in shards.items()}
+
+
+def _join_shards(header: bytes, shards: Dict[str, bytes]) -> bytes:
+    return header + b"\n" + b"".join(shards[k] for k in sorted(shards))
+
+
+def _get_manifest(repo_file_path: str) -> Tuple[Optional[dict], Optional[str]]:
+    """(manifest, jeho sha) nebo (None, None), když v repu ještě není."""
+    r = session.get(_api_url(_manifest_path(repo_file_path)), params={"ref": GH_BRANCH}, timeout=20)
+    if r.status_code != 200:
+        return None, None
+    j = r.json()
+    content = j.get("content")
+    return (json.loads(base64.b64decode(content)) if content else None), j.get("sha")
+
+
+def fetch_sharded(repo_file_path: str, local_file_path: str) -> bool:
+    """
+    Stáhne jen shardy, jejichž SHA se liší od lokální kopie (<local>.shards/), a složí z nich
+    lokální CSV. Když manifest v repu ještě není, spadne na fetch_from_repo (jeden soubor).
+    """
+    try:
+        manifest, _ = _get_manifest(repo_file_path)
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠️ Manifest fetch error {repo_file_path}: {e}")
+        manifest = None
+    if not manifest:
+        return fetch_from_repo(repo_file_path, local_file_path, prefer_api=True)
+
+    cache_dir = local_file_path + ".shards"
+    os.makedirs(cache_dir, exist_ok=True)
+    shards: Dict[str, bytes] = {}
+    downloaded = 0
+    try:
+        for key, info in manifest.get("shards", {}).items():
+            # lokální cache shardů je nekomprimovaná; raw_sha = SHA obsahu před kompresí
+            local_shard = os.path.join(cache_dir, f"{key}.csv")
+            data = None
+            if os.path.exists(local_shard):
+                with open(local_shard, "rb") as f:
+                    data = f.read()
+                if git_blob_sha(data) != info.get("raw_sha", info["sha"]):
+                    data = None
+            if data is None:
+                data = _decompress(_get_blob(info["sha"]), codec_of(info["path"]))
+                _write_atomic(local_shard, data)
+                downloaded += 1
+            shards[key] = data
+    except (requests.RequestException, *_DECODE_ERRORS) as e:
+        print(f"⚠️ Shard fetch error {repo_file_path}: {e}")
+        return False
+
+    for name in os.listdir(cache_dir):
+        if name.endswith(".csv") and name[:-4] not in shards:
+            os.remove(os.path.join(cache_dir, name))
+
+    content = _join_shards(manifest.get("header", "").encode("utf-8"), shards)
+    current = None
+    if os.path.exists(local_file_path):
+        with open(local_file_path, "rb") as f:
+            current = f.read()
+    if current != content:
+        _write_atomic(local_file_path, content)
+    print(f"✅ Sharded fetch {repo_file_path}: {len(shards)} shards, downloaded {downloaded}")
+    return True
+
+
+def commit_files(files: Dict[str, Optional[bytes]], message: str, retries: int = 2) -> Optional[str]:
+    """
+    Jeden atomický commit více souborů přes Git Data API.
+    files: {cesta v repu: obsah} ; None = smazat soubor. Vrací SHA nového commitu.
+    """
+    if not GH_TOKEN:
+        print("⚠️ GH_TOKEN not set — skipping commit")
+        return None
+
+    blobs: Dict[str, Optional[str]] = {}
+    for path, data in files.items():
+        if data is None:
+            blobs[path] = None
+            continue
+        r = session.post(_git_url("blobs"), json={"content": base64.b64encode(data).decode("ascii"), "encoding": "base64"}, timeout=30)
+        r.raise_for_status()
+        blobs[path] = r.json()["sha"]
+
+    tree = [{"path": p, "mode": "100644", "type": "blob", "sha": sha} for p, sha in blobs.items()]
+    for attempt in range(retries + 1):
+        r = session.get(_git_url(f"ref/heads/{GH_BRANCH}"), timeout=20)
+        r.raise_for_status()
+        head = r.json()["object"]["sha"]
+        r = session.get(_git_url(f"commits/{head}"), timeout=20)
+        r.raise_for_status()
+        base_tree = r.json()["tree"]["sha"]
+
+        r = session.post(_git_url("trees"), json={"base_tree": base_tree, "tree": tree}, timeout=30)
+        r.raise_for_status()
+        r = session.post(_git_url("commits"), json={"message": message, "tree": r.json()["sha"], "parents": [head]}, timeout=30)
+        r.raise_for_status()
+        commit_sha = r.json()["sha"]
+
+        r = session.patch(_git_url(f"refs/heads/{GH_BRANCH}"), json={"sha": commit_sha, "force": False}, timeout=20)
+        if r.status_code == 200:
+            print(f"✅ Committed {len(files)} file(s) (commit={commit_sha})")
+            return commit_sha
+        # 422 = větev mezitím posunul někdo jiný -> znovu nad novým HEAD
+        print(f"⚠️ Ref update failed (attempt {attempt + 1}): status={r.status_code} body={r.text[:200]}")
+    return None
+
+
+def save_sharded(local_file_path: str, repo_file_path: str, message: str,
+                 extra_files: Optional[Dict[str, Optional[bytes]]] = None) -> Optional[str]:
+    """
+    Commitne jen změněné měsíční shardy + manifest (a případně extra_files ve stejném commitu).
+    Vrací SHA commitu (None = chyba / bez tokenu).
+    """
+    if not GH_TOKEN:
+        print("⚠️ GH_TOKEN not set — skipping commit")
+        return None
+    if not os.path.exists(local_file_path):
+        raise FileNotFoundError(f"Local file not found: {local_file_path}")
+
+    with open(local_file_path, "rb") as f:
+        header, shards = split_csv_shards(f.read())
+
+    try:
+        manifest, manifest_sha = _get_manifest(repo_file_path)
+        manifest = manifest or {}
+        old = manifest.get("shards", {})
+        base = _shard_dir(repo_file_path)
+        codec = _write_codec()
+        changes: Dict[str, Optional[bytes]] = {}
+        new_shards = {}
+        for key, data in shards.items():
+            path = posixpath.join(base, f"{key}.csv" + _EXT.get(codec, ""))
+            raw_sha = git_blob_sha(data)
+            prev = old.get(key, {})
+            if prev.get("path") == path and prev.get("raw_sha", prev.get("sha")) == raw_sha:
+                new_shards[key] = prev   # beze změny -> nekomprimujeme znovu
+                continue
+            stored = _compress(data, codec)
+            new_shards[key] = {"path": path, "sha": git_blob_sha(stored), "raw_sha": raw_sha,
+                               "rows": data.count(b"\n")}
+            changes[path] = stored
+            if prev.get("path") and prev["path"] != path:
+                changes[prev["path"]] = None   # změna komprese -> starý shard pryč
+        for key, info in old.items():
+            if key not in shards:
+                changes[info["path"]] = None
+        if not manifest:
+            # první sharded commit: starý jednosouborový CSV v repu smažeme (jinak by zastarával)
+            for variant in _remote_variants(repo_file_path):
+                changes[_variant_path(repo_file_path, variant)] = None
+
+        new_manifest = {
+            "format": 1,
+            "source": repo_file_path,
+            "header": header.decode("utf-8", errors="ignore"),
+            "compression": codec,
+            "shards": new_shards,
+        }
+        if extra_files:
+            changes.update(extra_files)
+        if not changes and manifest.get("header") == new_manifest["header"]:
+            print(f"ℹ️ {repo_file_path}: no shard changed — nothing to commit")
+            return manifest_sha
+        changes[_manifest_path(repo_file_path)] = json.dumps(new_manifest, indent=1, sort_keys=True).encode("utf-8")
+        return commit_files(changes, message)
+    except requests.RequestException as e:
+        print(f"❌ Sharded commit failed for {repo_file_path}: {e}")
+        return None
+
+
+# ====== VOLBA LAYOUTU ======
+# repo_path -> {"fetched": ts, "saved": ts} posledních úspěšných synchronizací (pro /healthz)
+SYNC_STATUS: Dict[str, Dict[str, float]] = {}
+
+
+def _mark_sync(repo_file_path: str, kind: str) -> None:
+    SYNC_STATUS.setdefault(repo_file_path, {})[kind] = time.time()
+
+
+def fetch_dataset(repo_file_path: str, local_file_path: str, mark_sync: bool = True) -> bool:
+    """
+    Stáhne datový CSV podle GH_LAYOUT (jeden soubor / shardy).
+    mark_sync=False: stažení jinam než do pracovního souboru (diagnostika) – do SYNC_STATUS se nepočítá.
+    """
+    if GH_LAYOUT == "sharded":
+        ok = fetch_sharded(repo_file_path, local_file_path)
+    else:
+        ok = fetch_from_repo(repo_file_path, local_file_path, prefer_api=True)
+    if ok and mark_sync:
+        _mark_sync(repo_file_path, "fetched")
+    return ok
+
+
+def save_dataset(local_file_path: str, repo_file_path: str, message: str,
+                 extra_files: Optional[Dict[str, Optional[bytes]]] = None) -> Optional[str]:
+    """Commitne datový CSV podle GH_LAYOUT (jeden soubor / shardy); extra_files jdou do stejného commitu."""
+    if GH_LAYOUT == "sharded":
+        sha = save_sharded(local_file_path, repo_file_path, message, extra_files)
+    else:
+        sha = _save_single(local_file_path, repo_file_path, message, extra_files)
+    if sha:
+        _mark_sync(repo_file_path, "saved")
+    return sha
+
+
+def _save_single(local_file_path: str, repo_file_path: str, message: str,
+                 extra_files: Optional[Dict[str, Optional[bytes]]]) -> Optional[str]:
+    """
+    Jednosouborový layout. Bez komprese a bez jiných variant v repu = Contents API jako dřív;
+    jinak jeden commit přes Git Data API: soubor v cílové kompresi + smazání ostatních variant.
+    """
+    if not GH_TOKEN:
+        print("⚠️ GH_TOKEN not set — skipping commit")
+        return None
+    codec = _write_codec()
+    try:
+        stale = [c for c in _remote_variants(repo_file_path) if c != codec]
+        if codec is None and not stale and not extra_files:
+            return save_to_github(local_file_path, repo_file_path, message)
+        if not os.path.exists(local_file_path):
+            raise FileNotFoundError(f"Local file not found: {local_file_path}")
+        with open(local_file_path, "rb") as f:
+            files: Dict[str, Optional[bytes]] = {_variant_path(repo_file_path, codec): _compress(f.read(), codec)}
+        for c in stale:
+            files[_variant_path(repo_file_path, c)] = None
+        files.update(extra_files or {})
+        return commit_files(files, message)
+    except requests.RequestException as e:
+        print(f"❌ Commit failed for {repo_file_path}: {e}")
+        return None
+
+
+def get_dataset_meta(repo_file_path: str) -> Tuple[Optional[str], Optional[int]]:
+    """(sha, size) datového souboru, u shardů manifestu; u komprimovaného souboru jeho komprimované varianty."""
+    if GH_LAYOUT == "sharded":
+        return get_remote_meta(_manifest_path(repo_file_path))
+    _, sha, size = remote_variant(repo_file_path)
+    return sha, size
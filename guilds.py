@@ -0,0 +1,154 @@
+# guilds.py
+# ------------------------------------------------------------
+# Více serverů (guild) v jednom nasazení – každý má vlastní datový oddíl:
+#   - vlastní lokální soubory, cesty v repu, zapisovače, cache a profily
+#   - oddíl vzniká až při prvním použití (žádné načítání dat ostatních serverů)
+#   - nečinné oddíly se uvolní z paměti (evict_idle) – soubory na disku zůstanou
+# Konfigurace:
+#   GUILD_IDS   čárkou oddělená ID serverů (fallback GUILD_ID)
+#   INFO_CHANNEL_IDS  "guild:kanál,…" – kam posílat /vs_train a /vs_r4 (hlavní server má výchozí kanál)
+#   první server = původní umístění dat (power_data.csv, data/power_data.csv),
+#   ostatní: guilds/<id>/… lokálně a data/guilds/<id>/… v repu (i seznam R4)
+# ------------------------------------------------------------
+
+import os
+import time
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+import discord
+import pandas as pd
+
+from data_store import evict as evict_frame, load_power_df, load_vs_df
+from github_sync import fetch_from_repo
+from write_queue import FileWriter, get_writer, drop_writer
+from player_stats import PowerProfiles, VsProfiles
+from power_trend import AllianceTrend
+
+GUILD_IDS: List[int] = [
+    int(g) for g in os.getenv("GUILD_IDS", os.getenv("GUILD_ID", "1231529219029340234")).replace(" ", "").split(",") if g
+]
+GUILDS = [discord.Object(id=g) for g in GUILD_IDS]
+PRIMARY_GUILD_ID = GUILD_IDS[0]
+
+INFO_CHANNELS: Dict[int, int] = {PRIMARY_GUILD_ID: 1231533602194460752}
+INFO_CHANNELS.update(
+    (int(g), int(c)) for g, c in
+    (pair.split(":", 1) for pair in os.getenv("INFO_CHANNEL_IDS", "").replace(" ", "").split(",") if pair)
+)
+
+IDLE_MINUTES = float(os.getenv("GUILD_IDLE_MINUTES", "30"))   # po jaké nečinnosti oddíl uvolnit
+LOCAL_ROOT = "guilds"
+
+
+def _dirs(guild_id: int) -> Tuple[str, str]:
+    """(lokální adresář, adresář v repu) dat serveru."""
+    if guild_id == PRIMARY_GUILD_ID:
+        return "", "data"
+    return os.path.join(LOCAL_ROOT, str(guild_id)), f"data/guilds/{guild_id}"
+
+
+def local_data_files(guild_id: int) -> List[str]:
+    """Lokální datové soubory serveru – bez vytváření oddílu (např. pro /healthz)."""
+    local_dir, _ = _dirs(guild_id)
+    return [os.path.join(local_dir, name) for name in ("power_data.csv", "vs_data.csv")]
+
+
+class GuildData:
+    """Datový oddíl jednoho serveru: cesty, zapisovače a cache."""
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        local_dir, repo_dir = _dirs(guild_id)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        self.power_file = os.path.join(local_dir, "power_data.csv")
+        self.power_repo = f"{repo_dir}/power_data.csv"
+        self.vs_file = os.path.join(local_dir, "vs_data.csv")
+        self.vs_repo = f"{repo_dir}/vs_data.csv"
+        self.archive_dir = f"{repo_dir}/archive"
+        self.r4_file = os.path.join(local_dir, "r4_list.txt")
+        self.r4_repo = f"{repo_dir}/r4_list.txt"
+        # kanál pro /vs_train a /vs_r4 (None = server žádný nemá nastavený)
+        self.info_channel_id: Optional[int] = INFO_CHANNELS.get(guild_id)
+
+        # (verze dat, seřazený žebříček) pro /powertopplayer
+        self.top_cache: Optional[Tuple[Optional[str], pd.DataFrame]] = None
+        # cache pro autocomplete (aby fungoval i když CSV zrovna nejde přečíst)
+        self.players_cache: List[str] = []
+        # (verze power, verze VS, okno) -> tabulka efektivity pro /powerefficiency
+        self.efficiency_cache: Dict[Tuple[Optional[str], Optional[str], Optional[int]], pd.DataFrame] = {}
+        self.power_profiles = PowerProfiles()
+        self.vs_profiles = VsProfiles()
+        self.trend = AllianceTrend()     # denní síla aliance pro /powertrend
+        self.synced: Set[str] = set()   # datasety, které už se po otevření stáhly z repa
+        self.last_used = time.monotonic()
+
+    def touch(self) -> "GuildData":
+        self.last_used = time.monotonic()
+        return self
+
+    def power_writer(self) -> FileWriter:
+        """Jediný zapisovač power CSV oddílu (všechny zápisy i stažení jdou přes jeho frontu)."""
+        return get_writer(self.power_file, self.power_repo, load_power_df)
+
+    def vs_writer(self) -> FileWriter:
+        return get_writer(self.vs_file, self.vs_repo, load_vs_df)
+
+    def r4_list(self) -> List[str]:
+        """Hráči R4 tohoto serveru (jen čtení; soubor se spravuje v repu)."""
+        try:
+            with open(self.r4_file, encoding="utf-8") as f:
+                return [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def release(self) -> bool:
+        """
+        Uvolní data z paměti (snapshoty na disku zůstanou pro rychlé znovunačtení).
+        False = některý zapisovač ještě pracuje, oddíl zůstává.
+        """
+        if not all([drop_writer(path) for path in (self.power_file, self.vs_file)]):
+            return False
+        for path in (self.power_file, self.vs_file):
+            evict_frame(path)
+        return True
+
+
+_PARTITIONS: Dict[int, GuildData] = {}
+
+
+def partition(guild_id: Optional[int]) -> GuildData:
+    """Oddíl serveru (vytvoří se při prvním použití); mimo server (DM) = hlavní server."""
+    gid = guild_id or PRIMARY_GUILD_ID
+    gd = _PARTITIONS.get(gid)
+    if gd is None:
+        gd = _PARTITIONS[gid] = GuildData(gid)
+    return gd.touch()
+
+
+async def open_partition(guild_id: Optional[int], dataset: str = "power") -> GuildData:
+    """Jako partition(), ale při prvním otevření stáhne data serveru z repa ("power" / "vs")."""
+    gd = partition(guild_id)
+    if dataset not in gd.synced:
+        await (gd.vs_writer() if dataset == "vs" else gd.power_writer()).refresh()
+        if dataset == "vs":
+            # seznam R4 patří k VS datům serveru
+            await asyncio.to_thread(fetch_from_repo, gd.r4_repo, gd.r4_file)
+        gd.synced.add(dataset)
+    return gd
+
+
+def partitions() -> List[GuildData]:
+    return list(_PARTITIONS.values())
+
+
+def evict_idle(max_idle_minutes: float = IDLE_MINUTES) -> List[int]:
+    """Uvolní oddíly nečinné déle než limit (a bez rozpracovaných zápisů). Vrací jejich ID."""
+    cutoff = time.monotonic() - max_idle_minutes * 60
+    evicted = []
+    for gid, gd in list(_PARTITIONS.items()):
+        if gd.last_used < cutoff and gd.release():
+            del _PARTITIONS[gid]
+            evicted.append(gid)
+    return evicted
@@ -1,23 +1,153 @@
+# keepalive.py
+# ------------------------------------------------------------
+# HTTP server na event loopu bota (aiohttp – už je závislostí discord.py).
+#   /, /ping            – Render „open port“ kontrola
+#   /healthz            – skutečná připravenost: gateway + data hlavního serveru na disku
+#                         (nebo úspěšné stažení z repa); navíc načtená data,
+#                         čerstvost synchronizace, fronty; 503 když nejsme ready
+#   /lag                – statistiky zablokování smyčky (loop_monitor)
+#   /api/power/top      – žebříček power (JSON, ?limit=&offset=)
+#   /api/vs/top         – VS top podle tagu (?tag=&limit=)
+#   /api/vs/top_day     – VS top za poslední den (?limit=)
+#   API endpointy berou ?guild=<id> (výchozí = hlavní server); jen nakonfigurované servery
+# Vše jen čte z in-memory store / cache; nic nezapisuje.
+# ------------------------------------------------------------
+
 import os
-from threading import Thread
-from flask import Flask
+import time
+
+from aiohttp import web
+from discord.ext import commands
+
+import analytics
+from loop_monitor import monitor
+from data_store import loaded_versions, data_version
+from github_sync import SYNC_STATUS
+from write_queue import all_writers
+from dispatcher import dispatcher
+from guilds import GUILD_IDS, PRIMARY_GUILD_ID, GuildData, open_partition, partitions, local_data_files
+from power_slash import ranked_top_players
+
+MAX_LIMIT = 500
+
+_BOT_KEY = web.AppKey("bot", commands.Bot)
+
+
+def _int_arg(request: web.Request, name: str, default: int, hi: int = MAX_LIMIT) -> int:
+    try:
+        return max(0, min(hi, int(request.query.get(name, default))))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+
+
+async def _guild(request: web.Request, dataset: str) -> GuildData:
+    raw = request.query.get("guild")
+    try:
+        gid = int(raw) if raw else GUILD_IDS[0]
+    except ValueError:
+        raise web.HTTPBadRequest(text="guild must be an integer")
+    if gid not in GUILD_IDS:
+        raise web.HTTPNotFound(text="unknown guild")
+    return await open_partition(gid, dataset)
+
+
+async def root(request: web.Request) -> web.Response:
+    return web.Response(text="OK")
+
+
+async def ping(request: web.Request) -> web.Response:
+    return web.Response(text="pong")
+
+
+async def healthz(request: web.Request) -> web.Response:
+    bot = request.app[_BOT_KEY]
+    now = time.time()
+    connected = bot.is_ready() and not bot.is_closed()
+
+    data = loaded_versions()
+    for path, info in data.items():
+        # v paměti je stejná verze jako na disku?
+        info["current"] = info["version"] == data_version(path)
+
+    sync = {
+        repo: {kind: round(now - ts, 1) for kind, ts in marks.items()}   # stáří v sekundách
+        for repo, marks in SYNC_STATUS.items()
+    }
+    # připravenost nesmí záviset na tom, co je zrovna v paměti (evict_idle ji uvolní)
+    files_ok = all(os.path.exists(p) for p in local_data_files(PRIMARY_GUILD_ID))
+    fetched = any("fetched" in marks for marks in SYNC_STATUS.values())
+    lag = monitor.stats()
+    body = {
+        "ready": connected and (files_ok or fetched),
+        "gateway": {
+            "connected": connected,
+            "latency_ms": round(bot.latency * 1000, 1) if connected else None,
+            "guilds": len(bot.guilds) if connected else 0,
+        },
+        "data": data,
+        "data_files": files_ok,
+        "guilds_loaded": [gd.guild_id for gd in partitions()],
+        "sync_age_s": sync,
+        "queues": {
+            "writers": {w.local_path: w.qsize() for w in all_writers()},
+            "dispatcher": dispatcher.pending(),
+        },
+        "loop": {k: lag[k] for k in ("last_ms", "p99_ms", "max_ms", "blocks", "missed_interactions")},
+    }
+    return web.json_response(body, status=200 if body["ready"] else 503)
+
+
+async def lag(request: web.Request) -> web.Response:
+    # odpoví až po uvolnění smyčky; samotné bloky se ale zaznamenají i tak
+    return web.json_response(monitor.stats())
+
+
+async def power_top(request: web.Request) -> web.Response:
+    limit = _int_arg(request, "limit", 50)
+    offset = _int_arg(request, "offset", 0, hi=10**6)
+    ranked = await ranked_top_players(await _guild(request, "power"))
+    page = ranked.iloc[offset:offset + limit]
+    rows = [
+        {"rank": offset + i + 1, "player": r.player, "total": float(r.sum3),
+         "tank": float(r.tank), "rocket": float(r.rocket), "air": float(r.air)}
+        for i, r in enumerate(page.itertuples(index=False))
+    ]
+    return web.json_response({"total_players": int(len(ranked)), "offset": offset, "rows": rows})
+
+
+async def vs_top(request: web.Request) -> web.Response:
+    tag = request.query.get("tag", "").strip()
+    if not tag:
+        raise web.HTTPBadRequest(text="tag is required")
+    limit = _int_arg(request, "limit", 10)
+    gd = await _guild(request, "vs")
+    top = await analytics.run(analytics.vs_top_by_tag, gd.vs_file, data_version(gd.vs_file), tag, limit)
+    rows = [{"name": r.name, "points": int(r.points)} for r in top.itertuples(index=False)]
+    return web.json_response({"tag": tag, "rows": rows})
+
 
-app = Flask(__name__)
+async def vs_top_day(request: web.Request) -> web.Response:
+    limit = _int_arg(request, "limit", 10)
+    gd = await _guild(request, "vs")
+    latest, top = await analytics.run(analytics.vs_top_latest_day, gd.vs_file, data_version(gd.vs_file), limit)
+    rows = [{"name": r.name, "points": int(r.points)} for r in top.itertuples(index=False)]
+    return web.json_response({"date": latest, "rows": rows})
 
-@app.get("/")
-def root():
-    return "OK"
 
-@app.get("/ping")
-def ping():
-    return "pong"
+async def keepalive(bot: commands.Bot) -> web.AppRunner:
+    """Na Renderu otevře HTTP port (na smyčce bota, bez vlákna); vrací runner pro cleanup()."""
+    app = web.Application()
+    app[_BOT_KEY] = bot
+    app.router.add_get("/", root)
+    app.router.add_get("/ping", ping)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/lag", lag)
+    app.router.add_get("/api/power/top", power_top)
+    app.router.add_get("/api/vs/top", vs_top)
+    app.router.add_get("/api/vs/top_day", vs_top_day)
 
-def keepalive():
-    """Na Renderu otevře HTTP port, aby služba nepadala na port scan."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
     port = int(os.environ.get("PORT", "10000"))
-    Thread(
-        target=lambda: app.run(
-            host="0.0.0.0", port=port, debug=False, use_reloader=False
-        ),
-        daemon=True,
-    ).start()
+    await web.TCPSite(runner, host="0.0.0.0", port=port).start()
+    return runner
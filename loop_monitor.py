@@ -0,0 +1,118 @@
+# loop_monitor.py
+# ------------------------------------------------------------
+# Měření zablokování event loopu.
+#   - sampler (task ve smyčce) spí `interval` a měří, o kolik se probudil později
+#   - watchdog (vlákno) hlídá heartbeat sampleru; když smyčka stojí déle než
+#     práh, vezme stack vlákna smyčky -> víme, CO blokovalo, ne jen že blokovalo
+#   - každé zablokování nad prahem jde do logu (logger "vsbot.loop") se stackem;
+#     souhrn vrací `stats()` (keepalive endpoint /lag)
+#   - `note_missed()` volá _safe_defer, když interakce vypršela (NotFound)
+# ------------------------------------------------------------
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000.0
+LAG_THRESHOLD = float(os.getenv("LOOP_LAG_WARN_MS", "250")) / 1000.0
+STACK_DEPTH = 20        # kolik nejvnitřnějších rámců uložit
+KEEP_EVENTS = 20        # kolik posledních zablokování držet pro /lag
+
+log = logging.getLogger("vsbot.loop")
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = LAG_INTERVAL, threshold: float = LAG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._stack: Optional[str] = None     # stack zachycený watchdogem během aktuálního bloku
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._lags: Deque[float] = deque(maxlen=600)
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=KEEP_EVENTS)
+        self.max_lag = 0.0
+        self.blocks = 0
+        self.missed = 0
+
+    def start(self) -> None:
+        """Spustí sampler na běžící smyčce a watchdog vlákno (volat z korutiny)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sampler(), name="loop-monitor")
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _sampler(self) -> None:
+        while True:
+            self._stack = None
+            start = self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._record_block(lag, self._stack)
+
+    def _watchdog(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            stalled = time.monotonic() - self._beat - self.interval
+            if stalled < self.threshold or self._stack is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+
+    def _record_block(self, lag: float, stack: Optional[str]) -> None:
+        self.blocks += 1
+        self.events.append({
+            "at": time.time(),
+            "lag_ms": round(lag * 1000, 1),
+            "stack": stack,
+        })
+        if stack:
+            log.warning("Event loop blocked for %.0f ms; stack during block:\n%s", lag * 1000, stack)
+        else:
+            log.warning("Event loop blocked for %.0f ms (no stack captured)", lag * 1000)
+
+    def note_missed(self, what: str) -> None:
+        """Interakce vypršela dřív, než jsme stihli odpovědět – zaloguj s posledním blokem."""
+        self.missed += 1
+        last = self.events[-1] if self.events else None
+        if last and time.time() - last["at"] < 10:
+            log.warning("Interaction %s expired; loop was blocked %.0f ms just before", what, last["lag_ms"])
+        else:
+            log.warning("Interaction %s expired (no recent loop block recorded)", what)
+
+    def stats(self) -> Dict[str, Any]:
+        lags: List[float] = sorted(self._lags)
+        p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "last_ms": round(self._lags[-1] * 1000, 1) if self._lags else 0.0,
+            "p99_ms": round(p99 * 1000, 1),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "blocks": self.blocks,
+            "missed_interactions": self.missed,
+            "recent": list(self.events),
+        }
+
+
+monitor = LoopMonitor()
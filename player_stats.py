@@ -0,0 +1,193 @@
+# player_stats.py
+# ------------------------------------------------------------
+# Předpočítané profily hráčů pro /powerplayer a /vs_stats.
+#   - power: po hráči časová řada jednotek + souhrn za jednotku
+#     (poslední hodnota, předchozí odlišná, min, max, první, počet zápisů)
+#   - VS: po hráči body podle data
+#   - klíč = jméno casefold; cache patří jedné verzi dat (sha1 CSV)
+#   - append přes zapisovač se do profilů promítne přírůstkově (tracked());
+#     jakákoli jiná změna souboru (merge z GitHubu, mazání, kompakce)
+#     = jiná verze -> při dalším dotazu se profily přestaví celé
+# ------------------------------------------------------------
+
+import math
+import bisect
+import hashlib
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_power_df, load_vs_df, data_version
+
+UNITS = ["tank", "rocket", "air", "team4"]
+
+
+class UnitStats(NamedTuple):
+    latest: float
+    prev_distinct: Optional[float]   # poslední hodnota odlišná od latest (pro Δ)
+    low: float
+    high: float
+    first: float
+    count: int
+
+    def growth_pct(self) -> Optional[float]:
+        if self.count < 2 or self.first == 0:
+            return None
+        return (self.latest - self.first) / self.first * 100.0
+
+
+def _ns(ts: pd.Series) -> np.ndarray:
+    """Časy jako int ns od epochy (nezávisle na rozlišení, v jakém je pandas drží)."""
+    return pd.DatetimeIndex(ts).as_unit("ns").asi8
+
+
+def _unit_stats(values: List[float]) -> Optional[UnitStats]:
+    nums = [v for v in values if not math.isnan(v)]
+    if not nums:
+        return None
+    last = nums[-1]
+    prev = next((v for v in reversed(nums[:-1]) if v != last), None)
+    return UnitStats(last, prev, min(nums), max(nums), nums[0], len(nums))
+
+
+class PowerProfile:
+    """Historie jednoho hráče (seřazená podle času) + souhrn po jednotkách."""
+
+    __slots__ = ("name", "ts", "values", "units")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ts: List[int] = []                          # ns od epochy (UTC)
+        self.values: Dict[str, List[float]] = {c: [] for c in UNITS}
+        self.units: Dict[str, Optional[UnitStats]] = {}
+
+    @property
+    def entries(self) -> int:
+        return len(self.ts)
+
+    def _insert(self, ts: int, row: Dict[str, float]) -> None:
+        i = bisect.bisect_right(self.ts, ts)   # stejný čas -> za existující (pořadí souboru)
+        self.ts.insert(i, ts)
+        for c in UNITS:
+            self.values[c].insert(i, row[c])
+
+    def _summarize(self) -> None:
+        self.units = {c: _unit_stats(self.values[c]) for c in UNITS}
+
+    def since(self, start_ns: Optional[int]) -> int:
+        """Index prvního zápisu od `start_ns` (None = od začátku)."""
+        return 0 if start_ns is None else bisect.bisect_left(self.ts, start_ns)
+
+    def frame(self, lo: int = 0) -> pd.DataFrame:
+        """Zápisy od indexu `lo` jako DataFrame (timestamp + jednotky) – pro graf."""
+        data = {"timestamp": pd.to_datetime(np.asarray(self.ts[lo:], dtype="int64"), utc=True)}
+        for c in UNITS:
+            data[c] = np.asarray(self.values[c][lo:], dtype=np.float32)
+        return pd.DataFrame(data)
+
+
+class PowerProfiles:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self.players: Dict[str, PowerProfile] = {}
+
+    def _rebuild(self, path: str) -> None:
+        df = load_power_df(path)
+        version = data_version(path)
+        ts = _ns(df["timestamp"])
+        cols = {c: df[c].to_numpy(dtype=np.float32) for c in UNITS}
+        players: Dict[str, PowerProfile] = {}
+        for name, idx in df.groupby("player", observed=True).indices.items():
+            name = str(name)
+            prof = players.get(name.casefold())
+            if prof is None:
+                prof = players[name.casefold()] = PowerProfile(name)
+            if prof.ts:
+                # více zápisů jména lišících se velikostí písmen -> slít podle času
+                for j in idx:
+                    prof._insert(int(ts[j]), {c: float(cols[c][j]) for c in UNITS})
+            else:
+                prof.ts = ts[idx].tolist()
+                prof.values = {c: cols[c][idx].tolist() for c in UNITS}
+        for prof in players.values():
+            prof._summarize()
+        self.players, self.version = players, version
+
+    def get(self, path: str, player: str) -> Optional[PowerProfile]:
+        """Profil hráče pro aktuální verzi souboru (při jiné verzi přestaví cache). Blokující."""
+        with self._lock:
+            if self.version is None or self.version != data_version(path):
+                self._rebuild(path)
+            return self.players.get(str(player).strip().casefold())
+
+    def _apply(self, old_version: str, new_version: str, rows: pd.DataFrame) -> None:
+        with self._lock:
+            if self.version != old_version:
+                return   # cache je z jiného stavu -> přestaví se při dalším get()
+            touched = set()
+            ts = _ns(rows["timestamp"])
+            for j, name in enumerate(rows["player"].astype(str)):
+                key = name.casefold()
+                prof = self.players.get(key)
+                if prof is None:
+                    prof = self.players[key] = PowerProfile(name)
+                prof._insert(int(ts[j]), {c: float(np.float32(rows[c].iat[j])) for c in UNITS})
+                touched.add(key)
+            for key in touched:
+                self.players[key]._summarize()
+            self.version = new_version
+
+    def tracked(self, mutate: Callable, rows: pd.DataFrame) -> Callable:
+        """Obalí append mutaci zapisovače: po jejím použití promítne `rows` do profilů."""
+        def wrapped(content: bytes):
+            new, value, extra = mutate(content)
+            self._apply(hashlib.sha1(content).hexdigest(), hashlib.sha1(new).hexdigest(), rows)
+            return new, value, extra
+        return wrapped
+
+
+class VsProfiles:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self.players: Dict[str, Tuple[str, Dict[str, int]]] = {}   # key -> (jméno, {datum: body})
+
+    def _rebuild(self, path: str) -> None:
+        df = load_vs_df(path)
+        version = data_version(path)
+        sums = df.groupby(["name", "date"], observed=True)["points"].sum()
+        players: Dict[str, Tuple[str, Dict[str, int]]] = {}
+        for (name, date), points in sums.items():
+            name = str(name)
+            _, by_date = players.setdefault(name.casefold(), (name, {}))
+            by_date[str(date)] = by_date.get(str(date), 0) + int(points)
+        self.players, self.version = players, version
+
+    def get(self, path: str, player: str) -> Optional[List[Tuple[str, int]]]:
+        """Body hráče po datech (seřazeno podle data), None = hráč neexistuje. Blokující."""
+        with self._lock:
+            if self.version is None or self.version != data_version(path):
+                self._rebuild(path)
+            hit = self.players.get(str(player).strip().casefold())
+            return sorted(hit[1].items()) if hit else None
+
+    def _apply(self, old_version: str, new_version: str, rows: List[dict]) -> None:
+        with self._lock:
+            if self.version != old_version:
+                return
+            for r in rows:
+                name = str(r["name"]).strip()
+                _, by_date = self.players.setdefault(name.casefold(), (name, {}))
+                by_date[str(r["date"])] = by_date.get(str(r["date"]), 0) + int(r["points"])
+            self.version = new_version
+
+    def tracked(self, mutate: Callable, rows: List[dict]) -> Callable:
+        def wrapped(content: bytes):
+            new, value, extra = mutate(content)
+            self._apply(hashlib.sha1(content).hexdigest(), hashlib.sha1(new).hexdigest(), rows)
+            return new, value, extra
+        return wrapped
+
@@ -0,0 +1,116 @@
+# power_charts.py
+# ------------------------------------------------------------
+# Grafy pro power příkazy.
+#   - dlouhé řady se zmenší algoritmem LTTB (Largest-Triangle-Three-Buckets),
+#     který zachová tvar křivky (vrcholy, propady, skoky)
+#   - popisky jen u klíčových bodů: první, poslední, min, max a největší skoky
+#   -> čas vykreslení i velikost PNG nerostou s délkou historie
+# ------------------------------------------------------------
+
+import io
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import discord
+
+MAX_POINTS = 300     # max. bodů na jednu křivku po downsamplingu
+MAX_JUMPS = 3        # kolik největších skoků popsat
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indexy bodů vybraných LTTB (vždy včetně prvního a posledního)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    out = np.empty(threshold, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    # vnitřní body rozdělíme do threshold-2 kýblů
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # průměr následujícího kýblu (u posledního je to poslední bod)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # bod kýblu s největší plochou trojúhelníku (a, bod, průměr dalšího kýblu)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def key_point_indices(y: np.ndarray, jumps: int = MAX_JUMPS) -> List[int]:
+    """První, poslední, min, max a `jumps` největších změn mezi sousedními body."""
+    n = len(y)
+    if n == 0:
+        return []
+    keys = {0, n - 1, int(np.argmin(y)), int(np.argmax(y))}
+    if n > 1 and jumps > 0:
+        d = np.abs(np.diff(y))
+        for i in np.argsort(d)[::-1][:jumps]:
+            if d[i] > 0:
+                keys.add(int(i) + 1)  # popisujeme bod po skoku
+    return sorted(keys)
+
+
+def _draw(ax, ts: pd.Series, values: pd.Series, label: str, marker: Optional[str] = None) -> None:
+    mask = values.notna().to_numpy()
+    if not mask.any():
+        return
+    t = pd.DatetimeIndex(ts[mask])
+    y = values[mask].to_numpy(dtype=float)
+    x = t.asi8.astype(float)
+
+    idx = lttb_indices(x, y, MAX_POINTS)
+    ax.plot(t[idx], y[idx], label=label, marker=marker if len(idx) <= 60 else None)
+    for i in key_point_indices(y):
+        ax.annotate(f"{y[i]:.1f}", (t[i], y[i]), fontsize=8, ha="left", va="bottom")
+
+
+def _to_file(fig, filename: str) -> discord.File:
+    buf = io.BytesIO(); fig.tight_layout(); fig.savefig(buf, format="png"); plt.close(fig); buf.seek(0)
+    return discord.File(buf, filename=filename)
+
+
+def window(df: pd.DataFrame, days: Optional[int]) -> pd.DataFrame:
+    """Řádky za posledních `days` dní (None = celá historie)."""
+    if not days:
+        return df
+    start = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)
+    return df[df["timestamp"] >= start]
+
+
+def plot_series(df: pd.DataFrame, title: str) -> discord.File:
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    for col in ["tank", "rocket", "air", "team4"]:
+        if col in df.columns and df[col].notna().any():
+            _draw(ax, df["timestamp"], df[col], col)
+    ax.set_xlabel("time"); ax.set_ylabel("power"); ax.set_title(title); ax.legend()
+    return _to_file(fig, "power.png")
+
+
+def plot_compare(p1: pd.DataFrame, p2: pd.DataFrame, col: str, name1: str, name2: str) -> discord.File:
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    _draw(ax, p1["timestamp"], p1[col], name1, marker="o")
+    _draw(ax, p2["timestamp"], p2[col], name2, marker="o")
+    ax.set_title(f"Porovnání ({col})")
+    ax.set_xlabel("time"); ax.set_ylabel(col); ax.legend()
+    return _to_file(fig, "vs.png")
+
+
+def plot_trend(daily: pd.DataFrame, title: str) -> discord.File:
+    """Denní součty aliance (index = den) – jednotky + celkem."""
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    ts = pd.Series(daily.index, index=daily.index)
+    for col in ["tank", "rocket", "air", "total"]:
+        if col in daily.columns:
+            _draw(ax, ts, daily[col], col)
+    ax.set_xlabel("time"); ax.set_ylabel("power"); ax.set_title(title); ax.legend()
+    return _to_file(fig, "trend.png")
@@ -3,9 +3,14 @@
 # ------------------------------------------------------------
 # Stávající příkazy:
 #   /powerplayer, /powerdebug, /powerenter, /powertopplayer
+#   /powerimport (hromadný import z CSV/TSV přílohy, jeden commit)
+#   /powergrowth (žebříček růstu všech hráčů za okno, vektorově)
+#   /powercompact (admin: sloučení duplicit + rollup starých zápisů, archiv syrové historie)
+#   /powerefficiency (VS body vůči power – spojení obou datasetů přes sdílený index jmen)
+#   /powertrend (síla aliance v čase – denní řada se při zápisech jen prodlužuje)
 # Nové:
 #   /powerplayervsplayer (porovnání dvou hráčů v jednom teamu + graf)
-#   /storm (klikací výběr hráčů + rozdělení do týmů)
+#   /storm (klikací výběr hráčů + hledání a předvolby + rozdělení do týmů)
 # Diagnostika:
 #   /powernames, /powerreloadnames
 #
@@ -13,33 +18,40 @@
 #   - robustní načítání CSV (TAB/; -> ,) bez kolapsu prázdných polí
 #   - autocomplete NEVOLÁ síť – bere lokální CSV + cache (rychlé a spolehlivé)
 #   - /storm: u finálního kroku se ephemeral zpráva jen edituje (žádné mazání 404)
+#   - více serverů: každý příkaz pracuje s daty svého serveru (guilds.GuildData)
 # ------------------------------------------------------------
 
 import os
 import io
-import re
 import math
+import asyncio
+from collections import Counter
 from typing import Optional, List, Tuple
 
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
-from github_sync import fetch_from_repo, save_to_github, get_remote_meta
+from github_sync import (fetch_dataset, get_dataset_meta, remote_in_sync, local_blob_sha, compress_for_repo,
+                         GH_LAYOUT)
+from write_queue import append_lines
+from dispatcher import dispatcher
+from loop_monitor import monitor as loop_monitor
+from player_stats import UnitStats
+from guilds import GUILD_IDS, GUILDS, GuildData, partition, open_partition
+import analytics
+from power_charts import plot_series, plot_compare, plot_trend, window as _window
+from data_store import (POWER_HEADER, load_power_df, power_player_rows,
+                        power_csv_bytes, parse_power_csv, split_power_lines, data_version)
 
 # ====== KONFIG ======
-GUILD_ID = int(os.getenv("GUILD_ID", "1231529219029340234"))
-GUILD = discord.Object(id=GUILD_ID)
-
-REPO_POWER_PATH = "data/power_data.csv"   # cesta v repo (vs-data-store)
-LOCAL_POWER_FILE = "power_data.csv"       # lokální pracovní soubor
-POWER_HEADER = ["player", "tank", "rocket", "air", "team4", "timestamp"]  # pevné pořadí
-
-# cache pro autocomplete (aby fungoval i když CSV zrovna nejde přečíst)
-PLAYERS_CACHE: List[str] = []
+# servery, cesty k datům (lokálně i v repu), archiv a cache jsou po serverech – viz guilds.GuildData
+ROLLUP_DAYS = int(os.getenv("POWER_ROLLUP_DAYS", "90"))        # starší zápisy -> 1 za den/týden
+ROLLUP_FREQ = os.getenv("POWER_ROLLUP_FREQ", "daily")          # "daily" | "weekly"
+COMPACT_EVERY_HOURS = float(os.getenv("POWER_COMPACT_HOURS", "0"))  # 0 = jen ručně (/powercompact)
 
 # ====== HELPERY ======
 async def _safe_defer(interaction: discord.Interaction, ephemeral: bool = False) -> bool:
@@ -48,28 +60,13 @@ async def _safe_defer(interaction: discord.Interaction, ephemeral: bool = False)
             await interaction.response.defer(thinking=True, ephemeral=ephemeral)
         return True
     except discord.NotFound:
+        cmd = getattr(interaction.command, "qualified_name", None) or "?"
+        loop_monitor.note_missed(f"/{cmd}")
         return False
     except Exception as e:
         print(f"[defer] unexpected: {e}")
         return True
 
-def _ensure_csv(path: str, header: List[str]) -> None:
-    need = False
-    if not os.path.exists(path):
-        need = True
-    else:
-        try:
-            if os.path.getsize(path) == 0:
-                need = True
-            else:
-                _ = pd.read_csv(path, sep=None, engine="python")
-        except Exception:
-            need = True
-    if need:
-        import csv
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(header)
-
 def _normalize_number(x: Optional[str]) -> float:
     if x is None: return math.nan
     s = str(x).strip().replace(" ", "")
@@ -83,98 +80,80 @@ def _normalize_number(x: Optional[str]) -> float:
         try: return float(s.replace(".", "").replace(",", ""))
         except Exception: return math.nan
 
-def _load_power_df() -> pd.DataFrame:
+def _normalize_numbers(values: pd.Series) -> pd.Series:
+    """Vektorová obdoba _normalize_number pro celý sloupec (K/M přípony, čárka i tečka jako desetinná)."""
+    s = values.astype("string").str.strip().str.replace(" ", "", regex=False)
+    last = s.str[-1]
+    mult = np.select([last.isin(["M", "m"]).to_numpy(bool), last.isin(["K", "k"]).to_numpy(bool)], [1_000_000.0, 1_000.0], 1.0)
+    body = s.where(mult == 1.0, s.str[:-1])
+    first = pd.to_numeric(body.str.replace(",", ".", regex=False), errors="coerce").astype(float) * mult
+    second = pd.to_numeric(body.str.replace(".", "", regex=False).str.replace(",", "", regex=False), errors="coerce").astype(float)
+    return first.fillna(second)
+
+def _parse_import_table(raw: bytes) -> Tuple[pd.DataFrame, List[str]]:
     """
-    Robustní načtení CSV:
-    - NEkolabuje prázdná pole: zachová dvojité čárky ,, i prázdná team4
-    - rozděluje řádky podle [,\t;] a skládá přesně 6 sloupců v pořadí POWER_HEADER
-    - sjednotí typy a názvy, timestamp parsuje ISO i s T i s mezerou (UTC)
+    Načte CSV/TSV přílohu pro /powerimport a zvaliduje ji jedním průchodem.
+    Povinné sloupce: player, tank, rocket, air; volitelné: team4, timestamp.
+    Vrací (platné řádky v pořadí POWER_HEADER, seznam chyb).
     """
-    _ensure_csv(LOCAL_POWER_FILE, POWER_HEADER)
-
-    # 1) načti syrový text
-    with open(LOCAL_POWER_FILE, "rb") as f:
-        raw = f.read()
-    text = raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
-
-    lines = [ln for ln in text.split("\n") if ln.strip() != ""]
-    rows: List[List[str]] = []
-
-    # 2) zjisti, jestli první řádek je hlavička
-    has_header = False
-    if lines:
-        first = re.split(r"[,\t;]", lines[0])
-        has_header = any(tok.strip().lower() == "player" for tok in first)
-
-    # 3) data řádky (bez hlavičky)
-    data_lines = lines[1:] if has_header else lines
-
-    for ln in data_lines:
-        parts = re.split(r"[,\t;]", ln)  # zachová prázdná pole
-        parts = [p.strip() for p in parts]
-        if len(parts) < 6:
-            parts = parts + [""] * (6 - len(parts))
-        elif len(parts) > 6:
-            parts = parts[:6]
-        rows.append(parts)
-
-    # 4) poskládej do čistého CSV streamu
-    buf = io.StringIO()
-    buf.write(",".join(POWER_HEADER) + "\n")
-    for r in rows:
-        buf.write(",".join(r) + "\n")
-    buf.seek(0)
-
-    # 5) načti pandasem a přetypuj
-    df = pd.read_csv(buf, sep=",", dtype=str)
-
-    for c in POWER_HEADER:
-        if c not in df.columns:
-            df[c] = None
-
-    df["player"] = df["player"].astype(str).str.strip()
-    for c in ["tank","rocket","air","team4"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
-
-    df = df.dropna(subset=["timestamp"]).copy()
-    df = df[POWER_HEADER]
-    return df
-
-def _plot_series(df: pd.DataFrame, title: str) -> discord.File:
-    fig, ax = plt.subplots(figsize=(8, 4.5))
-    for col in ["tank","rocket","air","team4"]:
-        if col in df.columns and df[col].notna().any():
-            ax.plot(df["timestamp"], df[col], label=col)
-            for x,y in zip(df["timestamp"], df[col]):
-                if pd.isna(y): continue
-                ax.text(x, y, f"{float(y):.1f}", fontsize=8, ha="left", va="bottom")
-    ax.set_xlabel("time"); ax.set_ylabel("power"); ax.set_title(title); ax.legend()
-    buf = io.BytesIO(); fig.tight_layout(); fig.savefig(buf, format="png"); plt.close(fig); buf.seek(0)
-    return discord.File(buf, filename="power.png")
+    text = raw.decode("utf-8-sig", errors="ignore")
+    first = text.split("\n", 1)[0]
+    sep = "\t" if "\t" in first else (";" if ";" in first else ",")
+    table = pd.read_csv(io.StringIO(text), sep=sep, dtype=str, keep_default_na=False, skipinitialspace=True)
+    table.columns = [str(c).strip().lower() for c in table.columns]
+
+    missing = [c for c in ["player", "tank", "rocket", "air"] if c not in table.columns]
+    if missing:
+        return pd.DataFrame(columns=POWER_HEADER), [f"chybí sloupce: {', '.join(missing)}"]
+
+    out = pd.DataFrame({"player": table["player"].str.strip()})
+    for c in ["tank", "rocket", "air", "team4"]:
+        out[c] = _normalize_numbers(table[c]) if c in table.columns else math.nan
+
+    now = pd.Timestamp.now(tz="UTC")
+    if "timestamp" in table.columns:
+        ts = pd.to_datetime(table["timestamp"].replace("", None), errors="coerce", utc=True, format="ISO8601")
+        bad_ts = table["timestamp"].str.strip().ne("") & ts.isna()
+        ts = ts.fillna(now)
+    else:
+        ts = pd.Series(now, index=table.index)
+        bad_ts = pd.Series(False, index=table.index)
+    out["timestamp"] = ts.dt.strftime("%Y-%m-%d %H:%M:%S.%f+00:00")
+
+    bad_player = out["player"].eq("")
+    bad_units = out[["tank", "rocket", "air"]].isna().any(axis=1)
+    bad = bad_player | bad_units | bad_ts
+
+    errors = []
+    for idx in np.flatnonzero(bad.to_numpy()):
+        why = ("prázdné jméno" if bad_player.iat[idx] else
+               "neplatné číslo" if bad_units.iat[idx] else "neplatný timestamp")
+        errors.append(f"řádek {idx + 2}: {why}")  # +1 hlavička, +1 číslování od 1
+    return out.loc[~bad, POWER_HEADER], errors
+
+def _load_power_df(gd: GuildData) -> pd.DataFrame:
+    """Power data serveru z lokálního CSV přes sloupcový snapshot (viz data_store)."""
+    return load_power_df(gd.power_file)
 
 async def _send_long(interaction: discord.Interaction, header: str, lines: List[str]):
-    chunk = (header + "\n") if header else ""
-    for line in lines:
-        if len(chunk) + len(line) + 1 > 1900:
-            await interaction.followup.send(chunk.rstrip())
-            chunk = ""
-        chunk += line + "\n"
-    if chunk.strip():
-        await interaction.followup.send(chunk.rstrip())
-
-def _delta_prev_distinct(series: pd.Series):
-    s = series.dropna().astype(float).values
-    if len(s) < 2: return None
-    last = s[-1]
-    prev = next((s[i] for s_idx, i in enumerate(range(len(s)-2,-1,-1)) if s[i] != last), None)
-    if prev is None or prev == 0: return None
+    # řádky se skládají do co nejméně zpráv a posílají přes dispatcher (limit kanálu hlídá on)
+    await dispatcher.send_lines(interaction.followup, lines, header=header)
+
+def _format_delta(u: Optional[UnitStats]):
+    """Δ poslední hodnoty vůči předchozí odlišné (z předpočítaného souhrnu jednotky)."""
+    if u is None or u.prev_distinct is None or u.prev_distinct == 0: return None
+    last, prev = u.latest, u.prev_distinct
     diff = last - prev; pct = diff / prev * 100.0
     emoji = "⬆️" if diff > 0 else ("⬇️" if diff < 0 else "➡️")
     sign = "+" if diff >= 0 else ""
     return f"{emoji} {pct:.2f}% ({sign}{diff:.1f})"
 
+def _format_growth(u: Optional[UnitStats]):
+    """Celkový růst jednotky od prvního zápisu (první → poslední hodnota)."""
+    pct = u.growth_pct() if u is not None else None
+    if pct is None: return None
+    return f"{pct:+.2f}% ({u.first:,.1f} → {u.latest:,.1f})"
+
 def _sequence_line(values: List[float]) -> str:
     nums = [float(v) for v in values if not pd.isna(v)]
     if not nums: return "—"
@@ -193,75 +172,179 @@ def _sequence_line(values: List[float]) -> str:
 def _icon(name: str) -> str:
     return {"tank":"🛡️", "rocket":"🚀", "air":"✈️"}.get(name, name)
 
-def _total_power_row(row: pd.Series) -> float:
-    return (row.get("tank", 0.0) or 0.0) + (row.get("rocket", 0.0) or 0.0) + (row.get("air", 0.0) or 0.0)
-
 def _latest_by_player(df: pd.DataFrame) -> pd.DataFrame:
     """Poslední řádek za hráče podle timestamp."""
-    return df.sort_values("timestamp").groupby("player", as_index=False).tail(1)
+    return df.sort_values("timestamp").groupby("player", as_index=False, observed=True).tail(1)
+
+def _compact_power(df: pd.DataFrame, rollup_days: int, freq: str) -> Tuple[np.ndarray, int, int]:
+    """
+    Kompakce historie (vektorově):
+    1) zápisy starší než rollup_days -> jen poslední zápis hráče za den/týden
+    2) po sobě jdoucí stejné hodnoty hráče -> jen první zápis (poslední zápis hráče zůstává vždy)
+    Vrací (maska ponechaných řádků v pořadí df, počet srolovaných, počet sloučených duplicit).
+    Řádky bez platného času se nekompaktují (zůstávají).
+    """
+    keep = np.ones(len(df), dtype=bool)
+    d = df.reset_index(drop=True)
+    d = d[d["timestamp"].notna()].sort_values(["player", "timestamp"], kind="stable")
+    units = ["tank", "rocket", "air", "team4"]
+
+    cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=rollup_days)
+    old = d["timestamp"] < cutoff
+    day = d["timestamp"].dt.floor("D")
+    period = day - pd.to_timedelta(day.dt.weekday, unit="D") if freq == "weekly" else day
+    rolled = old & pd.DataFrame({"p": d["player"], "t": period}).duplicated(keep="last")
+    keep[d.index[rolled.to_numpy()]] = False
+    d = d.loc[~rolled]
+
+    vals = d[units]
+    prev = vals.shift()
+    same_vals = (vals.eq(prev) | (vals.isna() & prev.isna())).all(axis=1)
+    same_player = d["player"].eq(d["player"].shift())
+    is_last = d["player"].ne(d["player"].shift(-1))
+    collapsed = same_player & same_vals & ~is_last
+    keep[d.index[collapsed.to_numpy()]] = False
+    return keep, int(rolled.sum()), int(collapsed.sum())
+
+def _compaction_mutation(gd: GuildData, rollup_days: int, freq: str):
+    """
+    Mutace pro zapisovač: zkompaktní obsah souboru a syrovou historii přiloží jako archiv do stejného commitu.
+    Ponechané řádky se zapíšou v původních bajtech a pořadí (žádné float32 zaokrouhlení, žádné přeřazení).
+    """
+    def mutate(content: bytes):
+        header, lines = split_power_lines(content)
+        df = parse_power_csv(b"\n".join(lines), drop_invalid=False)
+        if len(df) != len(lines):
+            raise ValueError(f"kompakce: {len(df)} načtených řádků ≠ {len(lines)} řádků souboru — soubor nechávám beze změny")
+        keep, rolled, collapsed = _compact_power(df, rollup_days, freq)
+        stats = {"before": len(df), "after": int(keep.sum()), "rolled": rolled, "collapsed": collapsed, "archive": None}
+        if rolled == 0 and collapsed == 0:
+            return content, stats, None
+        stamp = pd.Timestamp.now(tz="UTC").strftime("%Y%m%dT%H%M%S")
+        # archiv syrové historie v kompresi repa (GH_COMPRESS) -> .csv.gz / .csv.zst
+        archive_path, archive = compress_for_repo(
+            f"{gd.archive_dir}/{os.path.splitext(os.path.basename(gd.power_repo))[0]}-{stamp}.csv", content)
+        stats["archive"] = archive_path
+        kept = [ln for ln, k in zip(lines, keep) if k]
+        new = b"\n".join(([header] if header is not None else []) + kept) + b"\n"
+        return new, stats, {archive_path: archive}
+    return mutate
+
+async def _run_compaction(gd: GuildData, rollup_days: int, freq: str, dry_run: bool) -> dict:
+    """Zkompaktní power data serveru přes zapisovač (merge-up, zápis, jeden commit i s archivem)."""
+    if dry_run:
+        await gd.power_writer().refresh()
+        df = _load_power_df(gd)
+        keep, rolled, collapsed = _compact_power(df, rollup_days, freq)
+        return {"before": len(df), "after": int(keep.sum()), "rolled": rolled, "collapsed": collapsed, "sha": None}
+    res = await gd.power_writer().submit(
+        _compaction_mutation(gd, rollup_days, freq), f"powercompact (>{rollup_days} d, {freq})")
+    stats = dict(res.value, sha=res.sha)
+    _rebuild_players_cache_from_local(gd)
+    return stats
+
+def _row_diff(left: pd.DataFrame, right: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """Řádky (v kanonickém CSV tvaru), které jsou jen vlevo / jen vpravo – s ohledem na duplicity."""
+    l = Counter(power_csv_bytes(left).decode("utf-8").splitlines()[1:])
+    r = Counter(power_csv_bytes(right).decode("utf-8").splitlines()[1:])
+    return sorted((l - r).elements()), sorted((r - l).elements())
+
+async def ranked_top_players(gd: GuildData) -> pd.DataFrame:
+    """Žebříček serveru podle součtu 3 týmů, cachovaný podle verze dat (sdílený pro všechny diváky)."""
+    version = data_version(gd.power_file)
+    if gd.top_cache is not None and gd.top_cache[0] == version:
+        return gd.top_cache[1]
+    grp = await analytics.run(analytics.top_players, gd.power_file, version)
+    gd.top_cache = (version, grp)
+    return grp
+
+async def _efficiency_table(gd: GuildData, days: Optional[int]) -> pd.DataFrame:
+    """Power × VS efektivita serveru, cachovaná pro dvojici verzí dat (power, VS) a okno."""
+    key = (data_version(gd.power_file), data_version(gd.vs_file), days)
+    hit = gd.efficiency_cache.get(key)
+    if hit is not None:
+        return hit
+    tbl = await analytics.run(analytics.power_vs_efficiency, gd.power_file, key[0], gd.vs_file, key[1], days)
+    # starší verze už nikdo nechce
+    gd.efficiency_cache = {k: v for k, v in gd.efficiency_cache.items() if k[:2] == key[:2]}
+    gd.efficiency_cache[key] = tbl
+    return tbl
 
 # === PLAYERS CACHE helpers (diagnostika) ===
-def _rebuild_players_cache_from_local() -> int:
-    """Načte lokální CSV a přestaví PLAYERS_CACHE (nejnovější nahoře). Vrátí počet hráčů."""
-    global PLAYERS_CACHE
+def _rebuild_players_cache_from_local(gd: GuildData) -> int:
+    """Načte lokální CSV serveru a přestaví jeho cache hráčů (nejnovější nahoře). Vrátí počet hráčů."""
     try:
-        df = _load_power_df()
+        df = _load_power_df(gd)
         if df.empty:
-            PLAYERS_CACHE = []
+            gd.players_cache = []
             return 0
-        latest = df.sort_values("timestamp").groupby("player", as_index=False).tail(1)
+        latest = _latest_by_player(df)
         latest = latest.sort_values("timestamp", ascending=False)
         names_sorted = latest["player"].astype(str).str.strip().tolist()
         seen = set()
-        PLAYERS_CACHE = [n for n in names_sorted if not (n in seen or seen.add(n))]
-        return len(PLAYERS_CACHE)
+        gd.players_cache = [n for n in names_sorted if not (n in seen or seen.add(n))]
+        return len(gd.players_cache)
     except Exception as e:
-        print(f"[players-cache] rebuild failed: {e}")
+        print(f"[players-cache] rebuild failed ({gd.guild_id}): {e}")
         return -1
 
 # ====== AUTOCOMPLETE ======
-def _all_players() -> List[str]:
-    """Rychlý seznam hráčů POUZE z lokálního CSV (bez sítě). Fallback na cache.
+def _all_players(gd: GuildData) -> List[str]:
+    """Rychlý seznam hráčů serveru POUZE z lokálního CSV (bez sítě). Fallback na cache.
     Pokud cache není naplněná, pokusí se ji postavit.
     """
-    global PLAYERS_CACHE
-    if not PLAYERS_CACHE:
-        _rebuild_players_cache_from_local()
-    return PLAYERS_CACHE or []
+    if not gd.players_cache:
+        _rebuild_players_cache_from_local(gd)
+    return gd.players_cache or []
 
-async def player_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+async def player_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    gd = partition(interaction.guild_id)
     try:
-        names = _all_players()
+        names = _all_players(gd)
         if current:
             q = current.casefold()
             names = [n for n in names if q in n.casefold()]  # podřetězcové hledání
         return [app_commands.Choice(name=n, value=n) for n in names[:25]]
     except Exception as e:
         print(f"[autocomplete] error: {e}")
-        fallback = (PLAYERS_CACHE[:25] if not current else
-                    [n for n in PLAYERS_CACHE if current.casefold() in n.casefold()][:25])
+        fallback = (gd.players_cache[:25] if not current else
+                    [n for n in gd.players_cache if current.casefold() in n.casefold()][:25])
         return [app_commands.Choice(name=n, value=n) for n in fallback]
 
 # ====== COG ======
 class PowerCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # naplníme cache hned při loadu Cogu
-        _rebuild_players_cache_from_local()
+        # data ani cache hráčů se nenačítají předem – každý server až při prvním použití (guilds)
+        if COMPACT_EVERY_HOURS > 0:
+            self.compact_loop.change_interval(hours=COMPACT_EVERY_HOURS)
+            self.compact_loop.start()
+
+    def cog_unload(self):
+        self.compact_loop.cancel()
+
+    @tasks.loop(hours=24)
+    async def compact_loop(self):
+        for gid in GUILD_IDS:
+            try:
+                gd = await open_partition(gid)
+                stats = await _run_compaction(gd, ROLLUP_DAYS, ROLLUP_FREQ, False)
+                print(f"[compact] {gid}: {stats}")
+            except Exception as e:
+                print(f"[compact] {gid} failed: {e}")
+
+    @compact_loop.before_loop
+    async def _before_compact(self):
+        await self.bot.wait_until_ready()
 
     # ---------- EXISTUJÍCÍ PŘÍKAZY ----------
     @app_commands.command(name="powerenter", description="Zapiš hodnoty power pro hráče")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(player="Jméno hráče", tank="Síla tanků", rocket="Síla raket", air="Síla letectva", team4="Síla 4. týmu (volitelné)")
     async def powerenter(self, interaction: discord.Interaction, player: str, tank: str, rocket: str, air: str, team4: Optional[str] = None):
         if not await _safe_defer(interaction, ephemeral=True): return
+        gd = await open_partition(interaction.guild_id)
 
-        # 1) merge-up z GitHubu (API) – mimo autocomplete nevadí síť
-        ok = fetch_from_repo(REPO_POWER_PATH, LOCAL_POWER_FILE, prefer_api=True)
-        if not ok: _ensure_csv(LOCAL_POWER_FILE, POWER_HEADER)
-
-        # 2) append lokálně
-        df = _load_power_df()
         new_row = {
             "player": str(player).strip(),
             "tank": _normalize_number(tank),
@@ -270,19 +353,17 @@ class PowerCommands(commands.Cog):
             "team4": _normalize_number(team4) if team4 is not None else math.nan,
             "timestamp": pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%d %H:%M:%S.%f+00:00'),
         }
-        pd.DataFrame([new_row], columns=POWER_HEADER).to_csv(LOCAL_POWER_FILE, mode='a', header=False, index=False)
+        line = pd.DataFrame([new_row], columns=POWER_HEADER).to_csv(header=False, index=False, lineterminator="\n")
 
-        # 3) commit + ověření + stáhnout zpět
-        sha_before, _ = get_remote_meta(REPO_POWER_PATH)
-        sha_after = save_to_github(LOCAL_POWER_FILE, REPO_POWER_PATH, f"powerenter: {player}")
-        sha_verify, size_verify = get_remote_meta(REPO_POWER_PATH)
-        fetch_from_repo(REPO_POWER_PATH, LOCAL_POWER_FILE, prefer_api=True)
+        # merge-up z GitHubu, append, atomický zápis a commit – vše ve frontě zapisovače
+        mutate = gd.power_profiles.tracked(append_lines(line.encode("utf-8"), POWER_HEADER), parse_power_csv(line.encode("utf-8")))
+        try:
+            res = await gd.power_writer().submit(mutate, f"powerenter: {player}")
+        except Exception as e:
+            await interaction.followup.send(f"❌ Zápis selhal: {e}", ephemeral=True); return
 
-        if sha_after:
-            await interaction.followup.send(
-                f"✅ Zapsáno a commitnuto: before={sha_before} -> after={sha_after} (verify={sha_verify}, size={size_verify})",
-                ephemeral=True
-            )
+        if res.sha:
+            await interaction.followup.send(f"✅ Zapsáno a commitnuto (sha={res.sha})", ephemeral=True)
         else:
             await interaction.followup.send(
                 "⚠️ Zapsáno lokálně, commit na GitHub **neproběhl** – zkontroluj GH_TOKEN/OWNER/REPO/BRANCH a logy.",
@@ -290,97 +371,243 @@ class PowerCommands(commands.Cog):
             )
 
         # po úspěšném zápisu aktualizuj cache (ať autocomplete hned zná nová jména)
-        _rebuild_players_cache_from_local()
+        _rebuild_players_cache_from_local(gd)
+
+    @app_commands.command(name="powerimport", description="Hromadný import power z CSV/TSV přílohy (jeden commit)")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(file="CSV/TSV se sloupci player, tank, rocket, air[, team4][, timestamp]",
+                           skip_invalid="Neplatné řádky přeskočit (jinak se celý import zamítne)")
+    async def powerimport(self, interaction: discord.Interaction, file: discord.Attachment, skip_invalid: bool = False):
+        if not await _safe_defer(interaction, ephemeral=True): return
+        gd = await open_partition(interaction.guild_id)
+
+        try:
+            rows, errors = _parse_import_table(await file.read())
+        except Exception as e:
+            await interaction.followup.send(f"⚠️ Soubor nejde načíst: {e}", ephemeral=True); return
+
+        if errors and not skip_invalid:
+            await interaction.followup.send(
+                f"⚠️ Import zamítnut, neplatných řádků: {len(errors)}\n" + "\n".join(errors[:15]) +
+                ("\n…" if len(errors) > 15 else "") + "\nOprav soubor nebo použij `skip_invalid`.",
+                ephemeral=True
+            ); return
+        if rows.empty:
+            await interaction.followup.send("⚠️ V souboru nejsou žádné platné řádky.", ephemeral=True); return
+
+        # merge-up, jeden append a jeden commit pro celý soubor (přes frontu zapisovače)
+        lines = rows.to_csv(header=False, index=False, lineterminator="\n").encode("utf-8")
+        mutate = gd.power_profiles.tracked(append_lines(lines, POWER_HEADER), parse_power_csv(lines))
+        try:
+            res = await gd.power_writer().submit(mutate, f"powerimport: {len(rows)} rows ({file.filename})")
+        except Exception as e:
+            await interaction.followup.send(f"❌ Import selhal, nic se nezapsalo: {e}", ephemeral=True); return
+        sha_after = res.sha
+        _rebuild_players_cache_from_local(gd)
+
+        skipped = f", přeskočeno: {len(errors)}" if errors else ""
+        if sha_after:
+            await interaction.followup.send(f"✅ Importováno řádků: {len(rows)}{skipped} (sha={sha_after})", ephemeral=True)
+        else:
+            await interaction.followup.send(
+                f"⚠️ Importováno lokálně ({len(rows)}{skipped}), commit na GitHub **neproběhl** – zkontroluj GH_TOKEN a logy.",
+                ephemeral=True
+            )
 
     @app_commands.command(name="powerplayer", description="Vývoj power pro hráče (graf + sekvence změn po týmech)")
-    @app_commands.guilds(GUILD)
-    @app_commands.describe(player="Jméno hráče")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(player="Jméno hráče", days="Jen posledních N dní (graf + sekvence; výchozí celá historie)")
     @app_commands.autocomplete(player=player_autocomplete)
-    async def powerplayer(self, interaction: discord.Interaction, player: str):
+    async def powerplayer(self, interaction: discord.Interaction, player: str, days: Optional[app_commands.Range[int, 1, 3650]] = None):
         if not await _safe_defer(interaction): return
-        fetch_from_repo(REPO_POWER_PATH, LOCAL_POWER_FILE, prefer_api=True)
+        gd = await open_partition(interaction.guild_id)
+        await gd.power_writer().refresh()
 
-        df = _load_power_df()
-        df_p = df[df["player"].str.lower() == player.lower()].sort_values("timestamp")
-        if df_p.empty:
+        prof = await asyncio.to_thread(gd.power_profiles.get, gd.power_file, player)
+        if prof is None or not prof.entries:
             await interaction.followup.send(f"⚠️ Žádná data pro **{player}**."); return
 
         parts = []
         for col in ["tank","rocket","air","team4"]:
-            if col not in df_p.columns: continue
-            d = _delta_prev_distinct(df_p[col]); label = col if col != "team4" else "team4"
-            parts.append(f"{label} {d}" if d else f"{label} Δ ?")
+            d = _format_delta(prof.units.get(col))
+            parts.append(f"{col} {d}" if d else f"{col} Δ ?")
         headline = " • ".join(parts)
+        growth = []
+        for col in ["tank", "rocket", "air"]:
+            g = _format_growth(prof.units.get(col))
+            if g:
+                growth.append(f"{_icon(col)} {g}")
+        if growth:
+            headline += "\n📈 Celkový růst: " + " • ".join(growth)
+
+        start = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)).value if days else None
+        lo = prof.since(start)
+        if lo >= prof.entries:
+            lo = prof.entries - 1   # v okně nic -> aspoň poslední zápis
 
         lines = []
         for col in ["tank","rocket","air"]:
-            if col not in df_p.columns or df_p[col].dropna().empty:
+            seq_values = prof.values[col][lo:]
+            if all(math.isnan(v) for v in seq_values):
                 continue
-            seq = _sequence_line(df_p[col].tolist())
+            seq = _sequence_line(seq_values)
             lines.append(f"**{_icon(col)} {col.upper()}:**\n{seq}\n")
 
-        file = _plot_series(df_p, f"Vývoj {player}")
+        title = f"Vývoj {player}" + (f" ({days} dní)" if days else "")
+        file = plot_series(prof.frame(lo), title)
         await interaction.followup.send(f"**{player}** — {headline}", file=file)
         await _send_long(interaction, "", lines)
 
     @app_commands.command(name="powerdebug", description="Porovná lokální a vzdálené CSV (rychlá diagnostika)")
-    @app_commands.guilds(GUILD)
-    async def powerdebug(self, interaction: discord.Interaction):
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(mode="summary = počty řádků, diff = jen rozdílné řádky")
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="summary", value="summary"),
+        app_commands.Choice(name="diff", value="diff"),
+    ])
+    async def powerdebug(self, interaction: discord.Interaction, mode: Optional[app_commands.Choice[str]] = None):
         if not await _safe_defer(interaction, ephemeral=True): return
+        gd = await open_partition(interaction.guild_id)
+        mode_v = mode.value if mode else "summary"
         try:
-            ldf = pd.read_csv(LOCAL_POWER_FILE, sep=None, engine="python"); l_rows = len(ldf)
+            ldf = parse_power_csv(gd.power_file); l_rows = len(ldf)
             l_tail = ldf.tail(3).to_string(index=False)
         except Exception as e:
-            l_rows = -1; l_tail = f"read error: {e}"
-        sha, size = get_remote_meta(REPO_POWER_PATH)
-        tmp = "_tmp_power.csv"
-        fetched = fetch_from_repo(REPO_POWER_PATH, tmp, prefer_api=True)
+            ldf = None; l_rows = -1; l_tail = f"read error: {e}"
+        sha, size = get_dataset_meta(gd.power_repo)
+
+        # shodný git blob SHA = shodný obsah -> nic nestahujeme (u shardů řeší fetch sám po shardech)
+        local_sha = local_blob_sha(gd.power_file)
+        if GH_LAYOUT != "sharded" and remote_in_sync(gd.power_repo, gd.power_file):
+            await interaction.followup.send(
+                f"✅ Local a remote jsou shodné (sha={local_sha}, rows={l_rows}) — nic se nestahovalo.", ephemeral=True)
+            return
+
+        tmp = f"_tmp_power_{gd.guild_id}.csv"
+        fetched = fetch_dataset(gd.power_repo, tmp, mark_sync=False)   # nestahuje se pracovní soubor
+        rdf = None
         if fetched:
             try:
-                rdf = pd.read_csv(tmp, sep=None, engine="python"); r_rows = len(rdf)
+                rdf = parse_power_csv(tmp); r_rows = len(rdf)
                 r_tail = rdf.tail(3).to_string(index=False)
             except Exception as e:
                 r_rows = -1; r_tail = f"read error: {e}"
         else:
             r_rows = -1; r_tail = "fetch failed"
+
+        if mode_v == "diff" and ldf is not None and rdf is not None:
+            only_local, only_remote = _row_diff(ldf, rdf)
+            lines = [f"**Local** sha={local_sha} rows={l_rows} • **Remote** sha={sha} rows={r_rows}",
+                     f"Jen lokálně: {len(only_local)} • Jen v repu: {len(only_remote)}"]
+            lines += [f"+ {r}" for r in only_local[:20]] + (["+ …"] if len(only_local) > 20 else [])
+            lines += [f"- {r}" for r in only_remote[:20]] + (["- …"] if len(only_remote) > 20 else [])
+            await interaction.followup.send("\n".join(lines)[:1900], ephemeral=True)
+            return
+
         msg = (
-            f"**Local**: rows={l_rows}\n```\n{l_tail}\n```\n"
+            f"**Local**: sha={local_sha}, rows={l_rows}\n```\n{l_tail}\n```\n"
             f"**Remote**: sha={sha}, size={size}, rows={r_rows}\n```\n{r_tail}\n```"
         )
         await interaction.followup.send(msg, ephemeral=True)
 
     @app_commands.command(name="powertopplayer", description="Všichni hráči podle součtu (tank+rocket+air)")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def powertopplayer(self, interaction: discord.Interaction):
         if not await _safe_defer(interaction): return
-        df = _load_power_df()
-        if df.empty:
+        gd = await open_partition(interaction.guild_id)
+        ranked = await ranked_top_players(gd)
+        if ranked.empty:
             await interaction.followup.send("⚠️ Žádná power data zatím nejsou."); return
-        grp = df.groupby("player", as_index=False).agg({"tank":"max","rocket":"max","air":"max"}).fillna(0.0)
-        grp["sum3"] = grp["tank"] + grp["rocket"] + grp["air"]
-        grp = grp.sort_values("sum3", ascending=False).reset_index(drop=True)
-        lines = [f"{i+1}. {row.player}: total={row.sum3:,.1f} (tank={row.tank:,.1f}, rocket={row.rocket:,.1f}, air={row.air:,.1f})"
-                 for i, row in grp.iterrows()]
-        await _send_long(interaction, "**TOP hráči (všichni, součet 3)**", lines)
+        view = LeaderboardView(interaction.user.id, ranked)
+        await interaction.followup.send(embed=view.page_embed(), view=view)
+
+    @app_commands.command(name="powergrowth", description="Žebříček růstu všech hráčů za zvolené období")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(days="Délka okna ve dnech (výchozí 30)", unit="Jednotka", by="Řadit podle absolutního nebo procentního růstu")
+    @app_commands.choices(unit=[
+        app_commands.Choice(name="total (tank+rocket+air)", value="total"),
+        app_commands.Choice(name="tank", value="tank"),
+        app_commands.Choice(name="rocket", value="rocket"),
+        app_commands.Choice(name="air", value="air"),
+    ], by=[
+        app_commands.Choice(name="absolutně", value="diff"),
+        app_commands.Choice(name="procenta", value="pct"),
+    ])
+    async def powergrowth(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 3650] = 30,
+                          unit: Optional[app_commands.Choice[str]] = None, by: Optional[app_commands.Choice[str]] = None):
+        if not await _safe_defer(interaction): return
+        gd = await open_partition(interaction.guild_id)
+        col = unit.value if unit else "total"
+        key = by.value if by else "diff"
+        tbl = await analytics.run(analytics.growth_table, gd.power_file, data_version(gd.power_file), col, days)
+        if tbl is None:
+            await interaction.followup.send("⚠️ Žádná power data zatím nejsou."); return
+        if tbl.empty:
+            await interaction.followup.send(f"⚠️ Za posledních {days} dní nejsou žádné zápisy."); return
+        tbl = tbl.sort_values([key, "diff"], ascending=False, na_position="last").reset_index(drop=True)
+
+        lines = []
+        for i, row in enumerate(tbl.itertuples(index=False), start=1):
+            pct = f"{row.pct:+.2f}%" if not pd.isna(row.pct) else "—"
+            lines.append(f"{i}. {row.player}: {row.diff:+,.1f} ({pct}) — {row.base:,.1f} → {row.last:,.1f}")
+        await _send_long(interaction, f"**📈 Růst {_icon(col)} {col} za {days} dní**", lines)
+
+    @app_commands.command(name="powerefficiency", description="VS body vůči power: kdo boduje nejvíc na svou sílu")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(days="VS body za posledních N dní (výchozí 30, 0 = celá historie)")
+    async def powerefficiency(self, interaction: discord.Interaction, days: app_commands.Range[int, 0, 3650] = 30):
+        if not await _safe_defer(interaction): return
+        gd = await open_partition(interaction.guild_id)
+        await open_partition(interaction.guild_id, "vs")
+        tbl = await _efficiency_table(gd, days or None)
+        if tbl.empty:
+            await interaction.followup.send("⚠️ Žádný hráč nemá zároveň power a VS body v tomto období."); return
+
+        lines = []
+        for i, row in enumerate(tbl.itertuples(index=False), start=1):
+            lines.append(f"{i}. {row.player}: {row.ratio:,.4g} b./power — VS {row.points:,} b. ({row.vs_days} dní), power {row.total:,.1f}")
+        period = f"za {days} dní" if days else "za celou historii"
+        await _send_long(interaction, f"**⚡ Efektivita (VS body / power) {period}**", lines)
+
+    @app_commands.command(name="powertrend", description="Síla celé aliance v čase (součet posledních hodnot všech hráčů)")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(days="Posledních N dní (výchozí 90, 0 = celá historie)")
+    async def powertrend(self, interaction: discord.Interaction, days: app_commands.Range[int, 0, 3650] = 90):
+        if not await _safe_defer(interaction): return
+        gd = await open_partition(interaction.guild_id)
+        series = await asyncio.to_thread(gd.trend.series, gd.power_file, days or None)
+        if series.empty:
+            await interaction.followup.send("⚠️ Žádná power data zatím nejsou."); return
+
+        first, last = series.iloc[0], series.iloc[-1]
+        diff = last["total"] - first["total"]
+        pct = f"{diff / first['total'] * 100:+.2f}%" if first["total"] else "—"
+        period = f"za {days} dní" if days else "za celou historii"
+        units = " | ".join(f"{_icon(c)} {last[c]:,.1f} ({last[c] - first[c]:+,.1f})" for c in ["tank", "rocket", "air"])
+        msg = (f"**📊 Síla aliance {period}**\n"
+               f"Celkem: {last['total']:,.1f} ({diff:+,.1f}, {pct})\n{units}")
+        await interaction.followup.send(msg, file=plot_trend(series, f"Síla aliance {period}"))
 
     # ---------- NOVÉ PŘÍKAZY ----------
     @app_commands.command(name="powerplayervsplayer", description="Porovná dva hráče v rámci zvoleného týmu (tank/rocket/air)")
-    @app_commands.guilds(GUILD)
-    @app_commands.describe(player1="První hráč", player2="Druhý hráč", team="Vyber: tank/rocket/air")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.describe(player1="První hráč", player2="Druhý hráč", team="Vyber: tank/rocket/air",
+                           days="Graf jen za posledních N dní (výchozí celá historie)")
     @app_commands.autocomplete(player1=player_autocomplete, player2=player_autocomplete)
     @app_commands.choices(team=[
         app_commands.Choice(name="tank", value="tank"),
         app_commands.Choice(name="rocket", value="rocket"),
         app_commands.Choice(name="air", value="air"),
     ])
-    async def powerplayervsplayer(self, interaction: discord.Interaction, player1: str, player2: str, team: app_commands.Choice[str]):
+    async def powerplayervsplayer(self, interaction: discord.Interaction, player1: str, player2: str, team: app_commands.Choice[str],
+                                  days: Optional[app_commands.Range[int, 1, 3650]] = None):
         if not await _safe_defer(interaction): return
-        fetch_from_repo(REPO_POWER_PATH, LOCAL_POWER_FILE, prefer_api=True)
-        df = _load_power_df()
+        gd = await open_partition(interaction.guild_id)
+        await gd.power_writer().refresh()
         col = team.value
 
-        p1 = df[df["player"].str.lower() == player1.lower()].sort_values("timestamp")
-        p2 = df[df["player"].str.lower() == player2.lower()].sort_values("timestamp")
+        p1 = power_player_rows(gd.power_file, player1)
+        p2 = power_player_rows(gd.power_file, player2)
         if p1.empty or p2.empty:
             await interaction.followup.send("⚠️ Hráč nenalezen v CSV."); return
 
@@ -389,19 +616,7 @@ class PowerCommands(commands.Cog):
         diff = last1 - last2 if not (math.isnan(last1) or math.isnan(last2)) else float("nan")
         pct = (diff / last2 * 100.0) if (not math.isnan(diff) and last2 != 0) else float("nan")
 
-        fig, ax = plt.subplots(figsize=(8, 4.5))
-        ax.plot(p1["timestamp"], p1[col], marker="o", label=player1)
-        ax.plot(p2["timestamp"], p2[col], marker="o", label=player2)
-        for x, y in zip(p1["timestamp"], p1[col]):
-            if pd.isna(y): continue
-            ax.text(x, y, f"{float(y):.1f}", fontsize=8, ha="left", va="bottom")
-        for x, y in zip(p2["timestamp"], p2[col]):
-            if pd.isna(y): continue
-            ax.text(x, y, f"{float(y):.1f}", fontsize=8, ha="left", va="bottom")
-        ax.set_title(f"Porovnání ({col})")
-        ax.set_xlabel("time"); ax.set_ylabel(col); ax.legend()
-        buf = io.BytesIO(); fig.tight_layout(); fig.savefig(buf, format="png"); plt.close(fig); buf.seek(0)
-        file = discord.File(buf, filename="vs.png")
+        file = plot_compare(_window(p1, days), _window(p2, days), col, player1, player2)
 
         if not math.isnan(diff) and not math.isnan(pct):
             sign = "+" if diff >= 0 else ""
@@ -412,61 +627,216 @@ class PowerCommands(commands.Cog):
         await interaction.followup.send(msg, file=file)
 
     @app_commands.command(name="storm", description="Vyber hráče (klikáním) a rozděl je do týmů")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def storm(self, interaction: discord.Interaction):
         if not await _safe_defer(interaction, ephemeral=True): return
+        gd = await open_partition(interaction.guild_id)
 
-        names = _all_players()
+        names = _all_players(gd)
         if not names:
             await interaction.followup.send("⚠️ Nenašli jsme žádné hráče v CSV.", ephemeral=True)
             return
 
-        view = StormPickerView(interaction.user.id, names, parent=self)
+        view = StormPickerView(interaction.user.id, names, gd, parent=self)
         await interaction.followup.send(
-            "Vyber hráče do STORM (můžeš stránkovat a přidávat). "
+            "Vyber hráče do STORM: **🔎 Hledat** zúží seznam, **Předvolby** přidají celé skupiny "
+            "(top N / aktivní), jinak můžeš stránkovat a přidávat. "
             "Až budeš hotov, klikni **✅ Hotovo**, vyber počet týmů a pak **🛡️ Rozdělit týmy**.",
             view=view,
             ephemeral=True
         )
 
+    @app_commands.command(name="powercompact", description="Admin: zkompaktní historii power (duplicity + rollup starých zápisů)")
+    @app_commands.guilds(*GUILDS)
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(older_than_days=f"Srolovat zápisy starší než N dní (výchozí {ROLLUP_DAYS})",
+                           granularity="Rollup po dnech nebo týdnech", dry_run="Jen spočítat, nic nezapisovat")
+    @app_commands.choices(granularity=[
+        app_commands.Choice(name="daily", value="daily"),
+        app_commands.Choice(name="weekly", value="weekly"),
+    ])
+    async def powercompact(self, interaction: discord.Interaction, older_than_days: Optional[app_commands.Range[int, 1, 3650]] = None,
+                           granularity: Optional[app_commands.Choice[str]] = None, dry_run: bool = False):
+        if not await _safe_defer(interaction, ephemeral=True): return
+        gd = await open_partition(interaction.guild_id)
+        days = older_than_days or ROLLUP_DAYS
+        freq = granularity.value if granularity else ROLLUP_FREQ
+        try:
+            stats = await _run_compaction(gd, days, freq, dry_run)
+        except Exception as e:
+            await interaction.followup.send(f"❌ Kompakce selhala: {e}", ephemeral=True); return
+
+        msg = (f"Řádků: {stats['before']} → {stats['after']} "
+               f"(sloučené duplicity: {stats['collapsed']}, srolováno ({freq}, >{days} dní): {stats['rolled']})")
+        if dry_run:
+            await interaction.followup.send(f"🔎 Dry run — {msg}", ephemeral=True)
+        elif stats["before"] == stats["after"]:
+            await interaction.followup.send(f"ℹ️ Není co kompaktovat. {msg}", ephemeral=True)
+        elif stats["sha"]:
+            await interaction.followup.send(f"✅ Zkompaktováno a commitnuto (sha={stats['sha']}). {msg}\nArchiv: `{stats['archive']}`", ephemeral=True)
+        else:
+            await interaction.followup.send(f"⚠️ Zkompaktováno lokálně, commit **neproběhl** – zkontroluj GH_TOKEN a logy. {msg}", ephemeral=True)
+
     # ---------- Diagnostika hráčů / cache ----------
     @app_commands.command(name="powernames", description="Diagnostika: kolik hráčů je v cache a kdo to je (prvních 30).")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def powernames(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        cnt = len(PLAYERS_CACHE)
-        sample = ", ".join(PLAYERS_CACHE[:30])
+        gd = partition(interaction.guild_id)
+        cnt = len(gd.players_cache)
+        sample = ", ".join(gd.players_cache[:30])
         await interaction.followup.send(f"Cache hráčů: {cnt}\nPrvních 30: {sample or '(prázdné)'}", ephemeral=True)
 
     @app_commands.command(name="powerreloadnames", description="Znovu načti seznam hráčů z lokálního CSV (bez sítě).")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def powerreloadnames(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        n = _rebuild_players_cache_from_local()
+        gd = partition(interaction.guild_id)
+        n = _rebuild_players_cache_from_local(gd)
         if n >= 0:
             await interaction.followup.send(f"✅ Cache přestavěna z lokálního CSV. Počet hráčů: {n}", ephemeral=True)
         else:
             await interaction.followup.send("⚠️ Nepovedlo se načíst lokální CSV – mrkni do logu.", ephemeral=True)
 
+# ====== UI View pro /powertopplayer ======
+class LeaderboardView(discord.ui.View):
+    """Stránkovaný žebříček v jedné zprávě (embed) místo série zpráv; data z cache podle verze."""
+    PAGE_SIZE = 20
+
+    def __init__(self, owner_id: int, ranked: pd.DataFrame, timeout: Optional[float] = 600):
+        super().__init__(timeout=timeout)
+        self.owner_id = owner_id
+        self.ranked = ranked
+        self.page = 0
+        self.highlight: Optional[int] = None   # zvýrazněné pořadí (🔎 Moje pořadí)
+
+    @property
+    def pages(self) -> int:
+        return max(1, (len(self.ranked) - 1) // self.PAGE_SIZE + 1)
+
+    def page_embed(self, page: Optional[int] = None, highlight: Optional[int] = None) -> discord.Embed:
+        page = self.page if page is None else page
+        highlight = self.highlight if highlight is None else highlight
+        start = page * self.PAGE_SIZE
+        lines = self.ranked["line"].iloc[start:start + self.PAGE_SIZE].tolist()
+        if highlight is not None and start <= highlight < start + self.PAGE_SIZE:
+            lines[highlight - start] = f"**{lines[highlight - start]}**"
+        emb = discord.Embed(title="TOP hráči (všichni, součet 3)", description="\n".join(lines) or "—")
+        emb.set_footer(text=f"Stránka {page+1}/{self.pages} • hráčů: {len(self.ranked)}")
+        return emb
+
+    def _for_viewer(self, user_id: int, page: int, highlight: Optional[int] = None) -> "LeaderboardView":
+        """Vlastní view diváka nad stejným (cachovaným) žebříčkem – stránkuje nezávisle na ostatních."""
+        view = LeaderboardView(user_id, self.ranked, timeout=self.timeout)
+        view.page, view.highlight = page, highlight
+        return view
+
+    async def _turn(self, interaction: discord.Interaction, page: int):
+        if interaction.user.id != self.owner_id:
+            # cizí divák dostane vlastní (ephemeral) stránku s vlastními tlačítky, sdílená zpráva se nemění
+            view = self._for_viewer(interaction.user.id, page)
+            await interaction.response.send_message(embed=view.page_embed(), view=view, ephemeral=True)
+            return
+        self.page = page
+        await interaction.response.edit_message(embed=self.page_embed(), view=self)
+
+    @discord.ui.button(label="⬅️ Předchozí", style=discord.ButtonStyle.secondary)
+    async def prev_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await self._turn(interaction, max(0, self.page - 1))
+
+    @discord.ui.button(label="Další ➡️", style=discord.ButtonStyle.secondary)
+    async def next_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await self._turn(interaction, min(self.pages - 1, self.page + 1))
+
+    @discord.ui.button(label="🔎 Moje pořadí", style=discord.ButtonStyle.primary)
+    async def me_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        names = {n.casefold() for n in (interaction.user.display_name, interaction.user.name) if n}
+        hits = np.flatnonzero(self.ranked["player"].str.casefold().isin(names).to_numpy())
+        if not hits.size:
+            await interaction.response.send_message("Tvoje jméno v žebříčku nevidím (hledám podle přezdívky na serveru).", ephemeral=True)
+            return
+        rank = int(hits[0])
+        view = self._for_viewer(interaction.user.id, rank // self.PAGE_SIZE, highlight=rank)
+        await interaction.response.send_message(embed=view.page_embed(), view=view, ephemeral=True)
+
+    @discord.ui.button(label="📄 Export CSV", style=discord.ButtonStyle.secondary)
+    async def export_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        out = self.ranked[["player", "sum3", "tank", "rocket", "air"]].rename(columns={"sum3": "total"})
+        out.insert(0, "rank", range(1, len(out) + 1))
+        buf = io.BytesIO(out.to_csv(index=False).encode("utf-8"))
+        await interaction.response.send_message(file=discord.File(buf, filename="powertop.csv"), ephemeral=True)
+
 # ====== UI View pro /storm ======
+def _filter_names(names: List[str], query: str) -> List[str]:
+    """Hráči odpovídající hledání: nejdřív shoda začátku jména, pak shoda uvnitř (bez ohledu na velikost)."""
+    q = query.strip().casefold()
+    if not q:
+        return names
+    folded = [(n, n.casefold()) for n in names]
+    prefix = [n for n, f in folded if f.startswith(q)]
+    inner = [n for n, f in folded if q in f and not f.startswith(q)]
+    return prefix + inner
+
+def _active_players(gd: GuildData, days: int) -> List[str]:
+    """Hráči se zápisem za posledních `days` dní (nejčerstvější první)."""
+    df = _load_power_df(gd)
+    start = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)
+    recent = df.loc[df["timestamp"] >= start, ["player", "timestamp"]].sort_values("timestamp", ascending=False)
+    return recent["player"].astype(str).unique().tolist()
+
+class StormSearchModal(discord.ui.Modal, title="Hledat hráče"):
+    query = discord.ui.TextInput(label="Jméno (začátek nebo část)", required=False, max_length=50,
+                                 placeholder="prázdné = všichni hráči")
+
+    def __init__(self, view: "StormPickerView"):
+        super().__init__()
+        self.picker = view
+        self.query.default = view.query
+
+    async def on_submit(self, interaction: discord.Interaction):
+        self.picker.query = str(self.query.value or "")
+        self.picker.page = 0
+        self.picker._rebuild_select()
+        await interaction.response.edit_message(content=self.picker.status(), view=self.picker)
+
 class StormPickerView(discord.ui.View):
-    """Stránkovaný výběr hráčů (Select má limit 25 položek). Po 'Hotovo' vybereš počet týmů a bot vygeneruje rozdělení."""
+    """
+    Výběr hráčů do STORM. Select má limit 25 položek, proto:
+    hledání (modal) zúží seznam, předvolby (top N / aktivní za X dní) přidají celé skupiny naráz,
+    'Vybrat nalezené' přidá všechny hráče odpovídající hledání. Po 'Hotovo' se vybere počet týmů.
+    """
     PAGE_SIZE = 25
 
-    def __init__(self, owner_id: int, all_names: List[str], parent: PowerCommands, timeout: Optional[float] = 300):
+    def __init__(self, owner_id: int, all_names: List[str], gd: GuildData, parent: PowerCommands, timeout: Optional[float] = 300):
         super().__init__(timeout=timeout)
         self.owner_id = owner_id
         self.all_names = all_names
+        self.gd = gd
         self.parent = parent
         self.page = 0
+        self.query = ""
         self.selected = set()  # vybraní hráči napříč stránkami
         self.team_count: Optional[int] = None
         self._rebuild_select()
 
+    def _matches(self) -> List[str]:
+        return _filter_names(self.all_names, self.query)
+
     def _page_slice(self) -> List[str]:
         start = self.page * self.PAGE_SIZE
         end = start + self.PAGE_SIZE
-        return self.all_names[start:end]
+        return self._matches()[start:end]
+
+    def status(self, note: str = "") -> str:
+        found = f" • Hledání „{self.query}“: {len(self._matches())}" if self.query else ""
+        teams = f" • Počet týmů: {self.team_count}" if self.team_count else ""
+        return (note + "\n" if note else "") + f"Vybráno hráčů: {len(self.selected)}{found}{teams}"
+
+    async def _check_owner(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
+            return False
+        return True
 
     def _rebuild_select(self):
         # odstranit starý Select (hráči) pokud existuje
@@ -479,23 +849,32 @@ class StormPickerView(discord.ui.View):
             label = name
             desc = "Vybrán" if name in self.selected else "Klikni pro výběr"
             options.append(discord.SelectOption(label=label, value=label, description=desc))
+        pages = max(1, (len(self._matches()) - 1) // self.PAGE_SIZE + 1)
+
+        if not options:
+            # prázdný výsledek hledání – Select nesmí být bez položek
+            select = discord.ui.Select(placeholder="Nic nenalezeno – zkus jiné hledání", disabled=True, row=3,
+                                       options=[discord.SelectOption(label="—", value="__none__")],
+                                       custom_id=f"players_page_{self.page}")
+            self.add_item(select)
+            self._rebuild_team_count_if_needed()
+            return
 
         select = discord.ui.Select(
-            placeholder=f"Stránka {self.page+1}/{(len(self.all_names)-1)//self.PAGE_SIZE+1} — vyber hráče (max 25)",
+            placeholder=f"Stránka {self.page+1}/{pages} — vyber hráče (max 25)",
             min_values=0,
             max_values=min(len(options), 25),
             options=options,
-            custom_id=f"players_page_{self.page}"
+            custom_id=f"players_page_{self.page}",
+            row=3,
         )
 
         async def on_select(interaction: discord.Interaction):
-            if interaction.user.id != self.owner_id:
-                await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
-                return
+            if not await self._check_owner(interaction): return
             for v in select.values:
                 self.selected.add(v)
             self._rebuild_select()
-            await interaction.response.edit_message(view=self)
+            await interaction.response.edit_message(content=self.status(), view=self)
 
         select.callback = on_select  # type: ignore
         self.add_item(select)
@@ -512,28 +891,48 @@ class StormPickerView(discord.ui.View):
         team_opts = [discord.SelectOption(label=str(n), value=str(n)) for n in range(2, 7)]
         team_select = discord.ui.Select(
             placeholder="Vyber počet týmů (2–6)",
-            min_values=1, max_values=1, options=team_opts, custom_id="team_count"
+            min_values=1, max_values=1, options=team_opts, custom_id="team_count", row=4
         )
 
         async def on_team_select(interaction: discord.Interaction):
-            if interaction.user.id != self.owner_id:
-                await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
-                return
+            if not await self._check_owner(interaction): return
             self.team_count = int(team_select.values[0])
-            await interaction.response.edit_message(
-                content=f"Vybráno hráčů: {len(self.selected)} • Počet týmů: {self.team_count} (upraveno)",
-                view=self
-            )
+            await interaction.response.edit_message(content=self.status("(upraveno)"), view=self)
 
         team_select.callback = on_team_select  # type: ignore
         self.add_item(team_select)
 
+    # ----- Předvolby -----
+    @discord.ui.select(placeholder="Předvolby: přidat skupinu hráčů…", row=2, options=[
+        discord.SelectOption(label="Top 10 podle total", value="top:10"),
+        discord.SelectOption(label="Top 20 podle total", value="top:20"),
+        discord.SelectOption(label="Top 30 podle total", value="top:30"),
+        discord.SelectOption(label="Top 50 podle total", value="top:50"),
+        discord.SelectOption(label="Aktivní za 3 dny", value="active:3"),
+        discord.SelectOption(label="Aktivní za 7 dní", value="active:7"),
+        discord.SelectOption(label="Aktivní za 14 dní", value="active:14"),
+        discord.SelectOption(label="Aktivní za 30 dní", value="active:30"),
+    ])
+    async def preset_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        if not await self._check_owner(interaction): return
+        await interaction.response.defer()
+        kind, n = select.values[0].split(":")
+        if kind == "top":
+            ranked = await ranked_top_players(self.gd)
+            names = ranked["player"].head(int(n)).tolist()
+            note = f"Přidáno top {n} podle total"
+        else:
+            names = await asyncio.to_thread(_active_players, self.gd, int(n))
+            note = f"Přidáni aktivní za {n} dní"
+        before = len(self.selected)
+        self.selected.update(names)
+        self._rebuild_select()
+        await interaction.edit_original_response(content=self.status(f"{note}: +{len(self.selected) - before}"), view=self)
+
     # ----- Buttons -----
-    @discord.ui.button(label="⬅️ Předchozí", style=discord.ButtonStyle.secondary)
+    @discord.ui.button(label="⬅️ Předchozí", style=discord.ButtonStyle.secondary, row=0)
     async def prev_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if interaction.user.id != self.owner_id:
-            await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
-            return
+        if not await self._check_owner(interaction): return
         if self.page > 0:
             self.page -= 1
             self._rebuild_select()
@@ -541,48 +940,53 @@ class StormPickerView(discord.ui.View):
         else:
             await interaction.response.defer()
 
-    @discord.ui.button(label="Další ➡️", style=discord.ButtonStyle.secondary)
+    @discord.ui.button(label="Další ➡️", style=discord.ButtonStyle.secondary, row=0)
     async def next_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if interaction.user.id != self.owner_id:
-            await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
-            return
-        if (self.page + 1) * self.PAGE_SIZE < len(self.all_names):
+        if not await self._check_owner(interaction): return
+        if (self.page + 1) * self.PAGE_SIZE < len(self._matches()):
             self.page += 1
             self._rebuild_select()
             await interaction.response.edit_message(view=self)
         else:
             await interaction.response.defer()
 
-    @discord.ui.button(label="🧹 Vyčistit výběr", style=discord.ButtonStyle.secondary)
-    async def clear_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if interaction.user.id != self.owner_id:
-            await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
+    @discord.ui.button(label="🔎 Hledat", style=discord.ButtonStyle.primary, row=0)
+    async def search_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        if not await self._check_owner(interaction): return
+        await interaction.response.send_modal(StormSearchModal(self))
+
+    @discord.ui.button(label="➕ Vybrat nalezené", style=discord.ButtonStyle.secondary, row=0)
+    async def add_matches_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        if not await self._check_owner(interaction): return
+        if not self.query:
+            await interaction.response.send_message("Nejdřív vyhledej hráče (🔎 Hledat).", ephemeral=True)
             return
+        before = len(self.selected)
+        self.selected.update(self._matches())
+        self._rebuild_select()
+        await interaction.response.edit_message(content=self.status(f"Přidáno nalezených: +{len(self.selected) - before}"), view=self)
+
+    @discord.ui.button(label="🧹 Vyčistit výběr", style=discord.ButtonStyle.secondary, row=0)
+    async def clear_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        if not await self._check_owner(interaction): return
         self.selected.clear()
         self._rebuild_select()
         await interaction.response.edit_message(content="Výběr vyčištěn.", view=self)
 
-    @discord.ui.button(label="✅ Hotovo", style=discord.ButtonStyle.success)
+    @discord.ui.button(label="✅ Hotovo", style=discord.ButtonStyle.success, row=1)
     async def done_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if interaction.user.id != self.owner_id:
-            await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
-            return
+        if not await self._check_owner(interaction): return
         if len(self.selected) < 2:
             await interaction.response.send_message("Vyber aspoň 2 hráče.", ephemeral=True)
             return
         # přepneme do režimu výběru počtu týmů
         self.team_count = 2  # výchozí
         self._rebuild_select()
-        await interaction.response.edit_message(
-            content=f"Vybráno hráčů: {len(self.selected)} • Počet týmů: {self.team_count} (upraveno)",
-            view=self
-        )
+        await interaction.response.edit_message(content=self.status("(upraveno)"), view=self)
 
-    @discord.ui.button(label="🛡️ Rozdělit týmy", style=discord.ButtonStyle.primary)
+    @discord.ui.button(label="🛡️ Rozdělit týmy", style=discord.ButtonStyle.primary, row=1)
     async def build_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if interaction.user.id != self.owner_id:
-            await interaction.response.send_message("Tento výběr nepatří tobě.", ephemeral=True)
-            return
+        if not await self._check_owner(interaction): return
         if not self.selected:
             await interaction.response.send_message("Nejsou vybraní hráči.", ephemeral=True)
             return
@@ -590,49 +994,29 @@ class StormPickerView(discord.ui.View):
             await interaction.response.send_message("Vyber nejprve počet týmů (2–6).", ephemeral=True)
             return
 
-        # 1) Připrav data
-        fetch_from_repo(REPO_POWER_PATH, LOCAL_POWER_FILE, prefer_api=True)
-        df = _load_power_df()
-        latest = _latest_by_player(df)
-        latest["total"] = latest.apply(_total_power_row, axis=1)
-
-        picked = latest[latest["player"].isin(self.selected)].copy()
-        if len(picked) < self.team_count + 2:
-            await interaction.response.send_message("⚠️ Málo vybraných hráčů pro rozdělení (potřeba alespoň 2 + počet týmů).", ephemeral=True)
+        # 1) Připrav data – refresh i výpočet můžou trvat déle než 3 s -> nejdřív potvrdit interakci
+        await interaction.response.defer()
+        await self.gd.power_writer().refresh()
+        split = await analytics.run(analytics.storm_split, self.gd.power_file, data_version(self.gd.power_file),
+                                    list(self.selected), self.team_count)
+        if split is None:
+            await interaction.followup.send("⚠️ Málo vybraných hráčů pro rozdělení (potřeba alespoň 2 + počet týmů).", ephemeral=True)
             return
-
-        picked = picked.sort_values("total", ascending=False).reset_index(drop=True)
-        attackers = picked.iloc[:2].copy()
-        rest = picked.iloc[2:].copy()
-
-        k = self.team_count
-        captains = rest.iloc[:k].copy()
-        rest = rest.iloc[k:].copy()
-
-        # inicializace týmů (kapitán + jeho síla)
-        teams: List[Tuple[str, float, List[str]]] = []
-        for _, cap in captains.iterrows():
-            teams.append([str(cap["player"]), float(cap["total"]), []])  # name, power, members
-
-        # greedy rozdělení zbytku: vždy přidej hráče do týmu s nejnižší silou
-        for _, row in rest.iterrows():
-            idx = min(range(len(teams)), key=lambda i: teams[i][1])
-            teams[idx][1] += float(row["total"])
-            teams[idx][2].append(str(row["player"]))
+        attackers, teams = split
 
         # Výstup (text)
         out_lines = []
-        out_lines.append(f"⚔️ Attack: 🛡️ {attackers.iloc[0]['player']}, 🛡️ {attackers.iloc[1]['player']}\n")
+        out_lines.append(f"⚔️ Attack: 🛡️ {attackers[0]}, 🛡️ {attackers[1]}\n")
         for i, (cap_name, power, members) in enumerate(teams, start=1):
             out_lines.append(f"👑 Kapitán Team {i}: {cap_name}")
             out_lines.append(f"   🧑‍🤝‍🧑 Hráči: {', '.join(members) if members else '—'}")
             out_lines.append(f"   🔋 Total power: {power:,.1f}\n")
 
         # 2) Edit ephemerální zprávy (zruší komponenty) – žádné mazání
-        await interaction.response.edit_message(content="Týmy vygenerovány 👇", view=None)
+        await interaction.edit_original_response(content="Týmy vygenerovány 👇", view=None)
 
-        # 3) Pošleme veřejně do kanálu
-        await interaction.channel.send("\n".join(out_lines))
+        # 3) Pošleme veřejně do kanálu (dispatcher rozdělí, kdyby se nevešlo do jedné zprávy)
+        await dispatcher.send_lines(interaction.channel, out_lines)
 
         # 4) ukončíme view
         self.stop()
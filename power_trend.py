@@ -0,0 +1,100 @@
+# power_trend.py
+# ------------------------------------------------------------
+# Síla aliance v čase pro /powertrend.
+#   - as-of součet: v každém okamžiku se sčítá poslední známá hodnota
+#     každého hráče (jako _latest_by_player, ale pro celou historii naráz)
+#   - jeden průchod historií seřazenou podle času: per-hráč forward-fill,
+#     rozdíl proti předchozímu zápisu hráče, kumulativní součet
+#   - výsledek se drží jako denní řada (stav na konci dne) + stav po hráčích
+#   - nové zápisy (novější než poslední známý) řadu jen prodlouží;
+#     cokoli jiného (kompakce, mazání, merge starších řádků) = přepočet celé řady
+# ------------------------------------------------------------
+
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_power_df, data_version
+
+UNITS = ["tank", "rocket", "air"]
+
+
+class AllianceTrend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self.n_rows = 0                          # kolik řádků (do last_ts včetně) je v řadě započteno
+        self.last_ts: Optional[int] = None       # ns nejnovějšího započteného zápisu
+        self.last: Dict[str, np.ndarray] = {}    # hráč -> poslední známé hodnoty UNITS
+        self.running = np.zeros(len(UNITS))      # aktuální součet aliance
+        self.daily = pd.DataFrame(columns=UNITS, dtype=float)
+
+    # ---------- výpočet ----------
+    def _full(self, df: pd.DataFrame) -> None:
+        d = df[["player", "timestamp"] + UNITS].sort_values("timestamp", kind="stable").reset_index(drop=True)
+        d["player"] = d["player"].astype(str)
+        vals = d[UNITS].astype(float)
+        # as-of: chybějící jednotka = poslední známá hodnota hráče (nic známého = 0)
+        filled = vals.groupby(d["player"], sort=False).ffill().fillna(0.0)
+        prev = filled.groupby(d["player"], sort=False).shift().fillna(0.0)
+        cum = (filled - prev).cumsum()
+
+        day = d["timestamp"].dt.floor("D")
+        daily = cum.groupby(day).last()
+        daily.index = pd.DatetimeIndex(daily.index, name=None)
+
+        last_rows = filled.groupby(d["player"], sort=False).last()
+        self.last = {p: row.to_numpy() for p, row in last_rows.iterrows()}
+        self.running = cum.iloc[-1].to_numpy() if len(cum) else np.zeros(len(UNITS))
+        self.daily = daily
+        self.n_rows = len(d)
+        self.last_ts = int(pd.DatetimeIndex(d["timestamp"]).as_unit("ns").asi8[-1]) if len(d) else None
+
+    def _extend(self, new: pd.DataFrame) -> None:
+        new = new.sort_values("timestamp", kind="stable")
+        ts = pd.DatetimeIndex(new["timestamp"])
+        days: Dict[pd.Timestamp, np.ndarray] = {}
+        for player, day, row in zip(new["player"].astype(str), ts.floor("D"), new[UNITS].to_numpy(dtype=float)):
+            before = self.last.get(player, np.zeros(len(UNITS)))
+            after = np.where(np.isnan(row), before, row)
+            self.running = self.running + (after - before)
+            self.last[player] = after
+            days[day] = self.running.copy()
+        upd = pd.DataFrame.from_dict(days, orient="index", columns=UNITS)
+        self.daily = upd if self.daily.empty else pd.concat([self.daily[~self.daily.index.isin(upd.index)], upd]).sort_index()
+        self.n_rows += len(new)
+        self.last_ts = int(ts.as_unit("ns").asi8.max())
+
+    def _update(self, path: str) -> None:
+        df = load_power_df(path)
+        version = data_version(path)
+        if version == self.version:
+            return
+        if self.version is not None and self.last_ts is not None and len(df):
+            ts = pd.DatetimeIndex(df["timestamp"]).as_unit("ns").asi8
+            newer = ts > self.last_ts
+            # starší část beze změny (stejný počet řádků) -> stačí přičíst nové zápisy
+            if newer.any() and int((~newer).sum()) == self.n_rows:
+                self._extend(df.loc[newer])
+                self.version = version
+                return
+        self._full(df)
+        self.version = version
+
+    # ---------- API ----------
+    def series(self, path: str, days: Optional[int] = None) -> pd.DataFrame:
+        """Denní součty aliance (tank/rocket/air/total) až do dneška, volitelně jen posledních `days` dní. Blokující."""
+        with self._lock:
+            self._update(path)
+            daily = self.daily
+        if daily.empty:
+            return pd.DataFrame(columns=UNITS + ["total"])
+        today = pd.Timestamp.now(tz="UTC").floor("D")
+        full = daily.reindex(pd.date_range(daily.index[0], max(today, daily.index[-1]), freq="D")).ffill()
+        if days:
+            full = full[full.index >= today - pd.Timedelta(days=days)]
+        full = full.assign(total=full[UNITS].sum(axis=1))
+        full.index.name = "timestamp"
+        return full
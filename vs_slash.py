@@ -1,3 +1,7 @@
+import re
+import asyncio
+import datetime
+
 import pandas as pd
 import discord
 from discord import app_commands
@@ -5,7 +9,11 @@ from discord.ext import commands
 from discord import Interaction, TextStyle
 import matplotlib.pyplot as plt
 import io
-from github_sync import save_to_github
+from write_queue import append_lines
+from dispatcher import dispatcher
+from data_store import VS_HEADER, load_vs_df, data_version
+import analytics
+from guilds import GUILDS, partition, open_partition
 
 def _normalize_date(date_str: str) -> str:
     """Normalize input date to YYYY-MM-DD. Accepts '10.5.25', '10.05.2025', '2025-05-10'."""
@@ -49,75 +57,79 @@ def _latest_date_from_series(series):
         return max(dates).strftime("%Y-%m-%d")
     return series.dropna().astype(str).max() if not series.empty else None
 
-# ID of your server
-GUILD_ID = 1231529219029340234
-GUILD = discord.Object(id=GUILD_ID)
-
-DB_FILE = "vs_data.csv"
-R4_LIST_FILE = "r4_list.txt"
-
-# Initialize CSV if missing
-try:
-    pd.read_csv(DB_FILE)
-except FileNotFoundError:
-    pd.DataFrame(columns=["name","points","date","tag"]).to_csv(DB_FILE, index=False)
+# Servers and per-server data files, info channel and R4 list live in guilds.py (GuildData)
 
-def load_r4_list():
-    try:
-        with open(R4_LIST_FILE) as f:
-            return [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        return []
+def _remove_date_mutation(date: str):
+    """Writer mutation: drop all rows whose date starts with `date`; returns the number removed."""
+    def mutate(content: bytes):
+        if not content.strip():
+            return content, 0, None   # no file yet -> nothing to remove
+        df = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
+        mask = df["date"].str.startswith(date)
+        if not mask.any():
+            return content, 0, None
+        return df[~mask].to_csv(index=False, lineterminator="\n").encode("utf-8"), int(mask.sum()), None
+    return mutate
 
 class VSCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # one upload session per server: guild_id -> {"date", "tag", "records"}
+        if not hasattr(bot, "upload_sessions"):
+            bot.upload_sessions = {}
 
     @app_commands.command(name="vs_start", description="Start uploading results")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(date="Date of the match (e.g., 10.5.25)", tag="Alliance tag")
     async def vs_start(self, interaction: discord.Interaction, date: str, tag: str):
         date = _normalize_date(str(date))
-        self.bot.upload_session = {"date": date, "tag": tag, "records": {}}
+        self.bot.upload_sessions[interaction.guild_id] = {"date": date, "tag": tag, "records": {}}
         await interaction.response.send_message(f"✅ Started upload for {date} ({tag}).")
 
     @app_commands.command(name="vs_finish", description="Finish and save uploaded results")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def vs_finish(self, interaction: discord.Interaction):
-        session = getattr(self.bot, "upload_session", None)
+        session = self.bot.upload_sessions.get(interaction.guild_id)
         if not session:
             return await interaction.response.send_message("⚠️ No upload session started.")
-        df = pd.read_csv(DB_FILE)
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
         new_data = [
             {"name": name, "points": points, "date": session["date"], "tag": session["tag"]}
             for name, points in session["records"].items()
         ]
-        df = pd.concat([df, pd.DataFrame(new_data)], ignore_index=True)
-        df.to_csv(DB_FILE, index=False)
-        save_to_github(DB_FILE, f"data/{DB_FILE}", "Update VS data")
-        delattr(self.bot, "upload_session")
-        await interaction.response.send_message(f"✅ Saved {len(new_data)} records.")
+        lines = pd.DataFrame(new_data, columns=VS_HEADER).to_csv(header=False, index=False, lineterminator="\n")
+        try:
+            await gd.vs_writer().submit(gd.vs_profiles.tracked(append_lines(lines.encode("utf-8"), VS_HEADER), new_data), "Update VS data")
+        except Exception as e:
+            # session stays so /vs_finish can be retried without re-uploading
+            return await interaction.followup.send(f"❌ Saving failed, upload session kept: {e}")
+        if self.bot.upload_sessions.get(interaction.guild_id) is session:
+            del self.bot.upload_sessions[interaction.guild_id]
+        await interaction.followup.send(f"✅ Saved {len(new_data)} records.")
 
     @app_commands.command(name="vs_aliance", description="List all stored alliance tags")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def vs_aliance(self, interaction: discord.Interaction):
-        df = pd.read_csv(DB_FILE)
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
+        df = load_vs_df(gd.vs_file)
         tags = sorted(df["tag"].dropna().unique())
-        await interaction.response.send_message("🛡️ Alliances: " + ", ".join(tags))
+        await interaction.followup.send("🛡️ Alliances: " + ", ".join(tags))
 
     @app_commands.command(name="vs_stats", description="Show stats for a player")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(player="Player name", graph="Include graph")
     async def vs_stats(self, interaction: discord.Interaction, player: str, graph: bool = False):
-        df = pd.read_csv(DB_FILE)
-        df_p = df[df["name"].str.lower() == player.lower()]
-        if df_p.empty:
-            return await interaction.response.send_message(f"No stats found for **{player}**.")
-        stats = df_p.groupby("date")["points"].sum().reset_index().sort_values("date")
-        lines = [f"{row['date']}: {row['points']:,}" for _, row in stats.iterrows()]
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
+        history = await asyncio.to_thread(gd.vs_profiles.get, gd.vs_file, player)
+        if not history:
+            return await interaction.followup.send(f"No stats found for **{player}**.")
+        stats = pd.DataFrame(history, columns=["date", "points"])
+        lines = [f"{date}: {points:,}" for date, points in history]
         msg = "📊 Stats for **{}**:\n".format(player) + "\n".join(lines)
         if graph:
-            await interaction.response.defer(thinking=True)
             fig, ax = plt.subplots()
             ax.plot(stats["date"], stats["points"], marker="o")
             ax.set_title(f"{player} stats")
@@ -127,20 +139,18 @@ class VSCommands(commands.Cog):
             await interaction.followup.send(file=discord.File(buf, "vs_stats.png"))
             plt.close()
         else:
-            await interaction.response.send_message(msg)
+            await interaction.followup.send(msg)
 
     @app_commands.command(name="vs_top_day", description="Show top players for latest day")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(graph="Send chart")
     async def vs_top_day(self, interaction: discord.Interaction, graph: bool = False):
-        df = pd.read_csv(DB_FILE)
-        latest = df["date"].max()
-        df_day = df[df["date"] == latest]
-        top = df_day.groupby("name")["points"].sum().reset_index().sort_values(by="points", ascending=False).head(10)
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
+        latest, top = await analytics.run(analytics.vs_top_latest_day, gd.vs_file, data_version(gd.vs_file), 10)
         lines = [f"{rank}. {row['name']} – {row['points']:,}" for rank, (_, row) in enumerate(top.iterrows(), start=1)]
         msg = f"🏆 Top players for {latest}\n" + "\n".join(lines)
         if graph:
-            await interaction.response.defer(thinking=True)
             fig, ax = plt.subplots()
             ax.barh(top["name"], top["points"])
             ax.set_title(f"Top 10 for {latest}")
@@ -149,19 +159,18 @@ class VSCommands(commands.Cog):
             await interaction.followup.send(file=discord.File(buf, "vs_top_day.png"))
             plt.close()
         else:
-            await interaction.response.send_message(msg)
+            await interaction.followup.send(msg)
 
     @app_commands.command(name="vs_top", description="Show top players by alliance tag")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(tag="Alliance tag", graph="Include graph")
     async def vs_top(self, interaction: discord.Interaction, tag: str, graph: bool = False):
-        df = pd.read_csv(DB_FILE)
-        df_tag = df[df["tag"] == tag]
-        top = df_tag.groupby("name")["points"].sum().reset_index().sort_values(by="points", ascending=False).head(10)
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
+        top = await analytics.run(analytics.vs_top_by_tag, gd.vs_file, data_version(gd.vs_file), tag, 10)
         lines = [f"{rank}. {row['name']} – {row['points']:,}" for rank, (_, row) in enumerate(top.iterrows(), start=1)]
         msg = f"🏅 Top players for {tag}\n" + "\n".join(lines)
         if graph:
-            await interaction.response.defer(thinking=True)
             fig, ax = plt.subplots()
             ax.barh(top["name"], top["points"])
             ax.set_title(f"Top 10 for {tag}")
@@ -170,55 +179,68 @@ class VSCommands(commands.Cog):
             await interaction.followup.send(file=discord.File(buf, "vs_top_tag.png"))
             plt.close()
         else:
-            await interaction.response.send_message(msg)
+            await interaction.followup.send(msg)
 
     @app_commands.command(name="vs_train", description="Send top player from latest day to TRAIN channel")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def vs_train(self, interaction: discord.Interaction):
-        df = pd.read_csv(DB_FILE)
-        r4_list = load_r4_list()
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
+        df = load_vs_df(gd.vs_file)
+        r4_list = gd.r4_list()
         latest = df["date"].max()
         df_day = df[df["date"] == latest]
         df_day = df_day[~df_day["name"].isin(r4_list)]
         top = df_day.sort_values(by="points", ascending=False).head(1)
-        ch = self.bot.get_channel(1231533602194460752)
-        for _, row in top.iterrows():
-            await ch.send(f"🏆 TRAIN: {row['name']} – {row['points']:,} pts")
-        await interaction.response.send_message("✅ Sent top TRAIN player to info channel.")
+        ch = self.bot.get_channel(gd.info_channel_id) if gd.info_channel_id else None
+        if ch is None:
+            return await interaction.followup.send("⚠️ Info channel is not configured or not reachable for this server.")
+        try:
+            await dispatcher.send_lines(ch, [f"🏆 TRAIN: {row['name']} – {row['points']:,} pts" for _, row in top.iterrows()])
+        except Exception as e:
+            return await interaction.followup.send(f"❌ Sending to info channel failed: {e}")
+        await interaction.followup.send("✅ Sent top TRAIN player to info channel.")
 
     @app_commands.command(name="vs_r4", description="Send top 2 R4 players for a tag")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(tag="Alliance tag")
     async def vs_r4(self, interaction: discord.Interaction, tag: str):
-        df = pd.read_csv(DB_FILE)
-        r4_list = load_r4_list()
+        await interaction.response.defer(thinking=True)
+        gd = await open_partition(interaction.guild_id, "vs")
+        df = load_vs_df(gd.vs_file)
+        r4_list = gd.r4_list()
         df_tag = df[df["tag"] == tag]
         df_tag = df_tag[df_tag["name"].isin(r4_list)]
-        top2 = df_tag.groupby("name")["points"].sum().reset_index().sort_values(by="points", ascending=False).head(2)
-        ch = self.bot.get_channel(1231533602194460752)
-        for _, row in top2.iterrows():
-            await ch.send(f"🥇 R4: {row['name']} – {row['points']:,} pts")
-        await interaction.response.send_message("✅ Sent top 2 R4 players to info channel.")
+        top2 = df_tag.groupby("name", observed=True)["points"].sum().reset_index().sort_values(by="points", ascending=False).head(2)
+        ch = self.bot.get_channel(gd.info_channel_id) if gd.info_channel_id else None
+        if ch is None:
+            return await interaction.followup.send("⚠️ Info channel is not configured or not reachable for this server.")
+        try:
+            await dispatcher.send_lines(ch, [f"🥇 R4: {row['name']} – {row['points']:,} pts" for _, row in top2.iterrows()])
+        except Exception as e:
+            return await interaction.followup.send(f"❌ Sending to info channel failed: {e}")
+        await interaction.followup.send("✅ Sent top 2 R4 players to info channel.")
 
     @app_commands.command(name="vs_remove", description="Remove all VS entries on given date")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     @app_commands.describe(date="Date of the entry to remove (YYYY-MM-DD)")
     async def vs_remove(self, interaction: discord.Interaction, date: str):
-        df = pd.read_csv(DB_FILE)
-        mask = df["date"].str.startswith(date)
-        if not mask.any():
-            return await interaction.response.send_message(
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        gd = partition(interaction.guild_id)
+        try:
+            res = await gd.vs_writer().submit(_remove_date_mutation(date), f"Removed VS entries on {date}")
+        except Exception as e:
+            return await interaction.followup.send(f"❌ Removing failed: {e}", ephemeral=True)
+        if not res.value:
+            return await interaction.followup.send(
                 f"No VS entries found for date **{date}**.", ephemeral=True
             )
-        df = df[~mask]
-        df.to_csv(DB_FILE, index=False)
-        save_to_github(DB_FILE, f"data/{DB_FILE}", f"Removed VS entries on {date}")
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"✅ All VS entries on **{date}** have been removed.", ephemeral=True
         )
 
     @app_commands.command(name="info", description="Show all bot commands")
-    @app_commands.guilds(GUILD)
+    @app_commands.guilds(*GUILDS)
     async def info(self, interaction: discord.Interaction):
         help_text = (
             "**VS Commands:**\n"
@@ -234,11 +256,17 @@ class VSCommands(commands.Cog):
             "/vs_remove <date> – remove all VS entries on given date\n\n"
             "**Power Commands:**\n"
             "/powerenter player tank rocket air [team4] – enter power data\n"
+            "/powerimport file [skip_invalid] – bulk import power data from CSV/TSV (one commit)\n"
             "/powertopplayer – show all power rankings (3 teams)\n"
+            "/powergrowth [days] [unit] [by] – rank all players by power growth over a window\n"
+            "/powerefficiency [days] – rank players by VS points per power\n"
+            "/powertrend [days] – alliance total power over time\n"
+            "/powercompact [older_than_days] [granularity] [dry_run] – admin: compact power history\n"
             "/powertopplayer4 – show all power rankings (incl. optional 4th team)\n"
             "/powererase – erase power records (last / all)\n"
             "/powerlist player – list & optionally delete power entries\n"
-            "/powerplayervsplayer player1 player2 team – compare two players by selected team\n/stormsetup teams:<#> – create balanced storm teams\n"
+            "/powerplayer player [days] – power history (chart + changes)\n"
+            "/powerplayervsplayer player1 player2 team [days] – compare two players by selected team\n/stormsetup teams:<#> – create balanced storm teams\n"
             ""
 
             "/info – show this help message\n"
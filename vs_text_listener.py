@@ -6,7 +6,8 @@ def setup_vs_text_listener(bot: commands.Bot):
     async def on_message(message):
         if message.author.bot:
             return
-        session = getattr(bot, "upload_session", None)
+        guild_id = message.guild.id if message.guild else None
+        session = getattr(bot, "upload_sessions", {}).get(guild_id)
         if not session:
             return
         lines = message.content.strip().split("\n")
@@ -0,0 +1,92 @@
+# vsbot.py
+# ------------------------------------------------------------
+# Bot: discord klient, cogy, HTTP server, prefetch dat.
+# Spouští se přes main.py – ten tento modul importuje až v hlavním procesu
+# (workery analytics ho tak nikdy nenačítají).
+# ------------------------------------------------------------
+
+import os
+import logging
+
+import discord
+from discord.ext import commands, tasks
+
+from keepalive import keepalive
+from github_sync import fetch_from_repo, fetch_dataset
+from power_slash import setup_power_commands
+from guilds import GUILDS, PRIMARY_GUILD_ID, partition, evict_idle
+import analytics
+from loop_monitor import monitor as loop_monitor
+
+# (VS příkazy nejsou potřeba; nechávám je pryč)
+
+TOKEN = os.getenv("DISCORD_TOKEN")
+if not TOKEN:
+    raise RuntimeError("Missing DISCORD_TOKEN in environment")
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("vsbot")
+
+# předem se stahují jen data hlavního serveru; ostatní servery si data stáhnou při prvním použití
+_PRIMARY = partition(PRIMARY_GUILD_ID)
+PREFETCH = [
+    (_PRIMARY.power_repo, _PRIMARY.power_file, True),   # True = datový CSV (může být shardovaný)
+    (_PRIMARY.vs_repo, _PRIMARY.vs_file, True),
+    (_PRIMARY.r4_repo, _PRIMARY.r4_file, False),
+]
+
+intents = discord.Intents.default()
+bot = commands.AutoShardedBot(command_prefix="!", intents=intents)
+
+@bot.event
+async def on_ready():
+    log.info("✅ Logged in as %s (%s), shards: %s", bot.user, getattr(bot.user, "id", "?"), bot.shard_count)
+    for guild in GUILDS:
+        try:
+            await bot.tree.sync(guild=guild)
+            log.info("✅ App commands synced to guild %s", guild.id)
+        except Exception as e:
+            log.exception("Slash command sync failed for guild %s: %s", guild.id, e)
+    if not evict_loop.is_running():
+        evict_loop.start()
+
+@tasks.loop(minutes=5)
+async def evict_loop():
+    evicted = evict_idle()
+    if evicted:
+        log.info("🧹 Released idle guild data: %s", evicted)
+
+async def prefetch_data():
+    any_ok = False
+    for repo_path, local_path, is_dataset in PREFETCH:
+        try:
+            if is_dataset:
+                ok = fetch_dataset(repo_path, local_path)
+            else:
+                ok = fetch_from_repo(repo_path, local_path, prefer_api=True)
+            if ok:
+                log.info("📥 Fetched %s -> %s", repo_path, local_path)
+                any_ok = True
+            else:
+                log.warning("⚠️ Could not fetch %s", repo_path)
+        except Exception as e:
+            log.exception("Fetch error for %s: %s", repo_path, e)
+    if not any_ok:
+        log.warning("⚠️ No data files could be fetched. Using local copies if present.")
+
+async def setup_all(bot: commands.Bot):
+    await setup_power_commands(bot)
+    log.info("🔌 Power commands loaded")
+
+async def main():
+    print("👀 RUNNING MAIN (keepalive + API fetch)")
+    web = await keepalive(bot)            # Render „open port“ fix + /healthz (na této smyčce)
+    loop_monitor.start()                  # měření zablokování event loopu (log + /lag)
+    await prefetch_data()                 # jednorázové stažení dat (API bez cache)
+    analytics.start([("power", _PRIMARY.power_file), ("vs", _PRIMARY.vs_file)])   # workery pro těžké výpočty
+    await setup_all(bot)                  # načtení cogů
+    try:
+        await bot.start(TOKEN)            # přihlášení bota
+    finally:
+        analytics.shutdown()
+        await web.cleanup()
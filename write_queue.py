@@ -0,0 +1,181 @@
+# write_queue.py
+# ------------------------------------------------------------
+# Jeden zapisovač (asyncio task) na datový soubor.
+#   - všechny změny lokálního CSV (append, mazání, kompakce) i stažení z repa
+#     jdou přes frontu -> žádné prokládání fetch / append / commit mezi příkazy
+#   - co se ve frontě nahromadí, zapíše se najednou: merge-up z GitHubu,
+#     postupné použití všech mutací, jeden atomický zápis (temp + rename),
+#     jeden commit, přenačtení in-memory store
+#   - volající dostane future s WriteResult (sha commitu + návratová hodnota mutace)
+# ------------------------------------------------------------
+
+import os
+import asyncio
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from github_sync import fetch_dataset, save_dataset, local_blob_sha
+from data_store import write_atomic
+
+# mutace: obsah souboru (bytes) -> (nový obsah, výsledek pro volajícího, extra soubory do commitu)
+Mutation = Callable[[bytes], Tuple[bytes, Any, Optional[Dict[str, Optional[bytes]]]]]
+
+
+class WriteResult(NamedTuple):
+    sha: Optional[str]      # SHA commitu/souboru, None = commit neproběhl
+    value: Any              # co vrátila mutace
+
+
+class _Job(NamedTuple):
+    mutate: Optional[Mutation]   # None = jen stáhnout z repa (refresh)
+    message: str
+    future: asyncio.Future
+
+
+class FileWriter:
+    """Serializuje všechny zápisy do jednoho lokálního souboru a jeho commit na GitHub."""
+
+    def __init__(self, local_path: str, repo_path: str, reload: Callable[[str], Any]):
+        self.local_path = local_path
+        self.repo_path = repo_path
+        self.reload = reload
+        self.queue: "asyncio.Queue[_Job]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"writer:{self.local_path}")
+
+    def submit(self, mutate: Mutation, message: str) -> "asyncio.Future[WriteResult]":
+        """Zařadí mutaci; vrátí future, který se vyřeší po zápisu a commitu."""
+        self._ensure_task()
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(_Job(mutate, message, fut))
+        return fut
+
+    def refresh(self) -> "asyncio.Future[WriteResult]":
+        """Zařadí stažení souboru z repa (bez commitu) – aby fetch nepřepsal rozpracovaný zápis."""
+        self._ensure_task()
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(_Job(None, "", fut))
+        return fut
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def idle(self) -> bool:
+        """Nic ve frontě ani rozpracovaného zápisu."""
+        return not self._busy and self.queue.empty()
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self._busy = True
+            try:
+                results = await asyncio.to_thread(self._apply, batch)
+                for job, res in zip(batch, results):
+                    if job.future.done():
+                        continue
+                    if isinstance(res, Exception):
+                        job.future.set_exception(res)
+                    else:
+                        job.future.set_result(res)
+            except Exception as e:
+                print(f"[writer] {self.local_path} batch failed: {e}")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+            finally:
+                self._busy = False
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _apply(self, batch: List[_Job]) -> List[Any]:
+        """
+        Běží ve vlákně, ale vždy jen jedno naráz (jediný task na soubor).
+        Vrací WriteResult nebo výjimku pro každý job; futures řeší až _run ve smyčce.
+        """
+        fetch_dataset(self.repo_path, self.local_path)   # merge-up
+        jobs = [j for j in batch if j.mutate is not None]
+        if not jobs:
+            self.reload(self.local_path)
+            return [WriteResult(None, None) for _ in batch]
+
+        content = b""
+        if os.path.exists(self.local_path):
+            with open(self.local_path, "rb") as f:
+                content = f.read()
+        original = content
+        values: List[Any] = []
+        extra: Dict[str, Optional[bytes]] = {}
+        for job in jobs:
+            try:
+                content, value, files = job.mutate(content)
+                values.append(value)
+                extra.update(files or {})
+            except Exception as e:
+                # vadná mutace neshodí ostatní v dávce
+                values.append(e)
+
+        if content == original and not extra:
+            sha = local_blob_sha(self.local_path)   # nic se nezměnilo -> žádný commit
+        else:
+            write_atomic(self.local_path, content)
+            message = jobs[0].message if len(jobs) == 1 else f"{len(jobs)} updates: " + "; ".join(j.message for j in jobs)
+            sha = save_dataset(self.local_path, self.repo_path, message[:1000], extra or None)
+        self.reload(self.local_path)
+
+        out: List[Any] = []
+        it = iter(values)
+        for job in batch:
+            if job.mutate is None:
+                out.append(WriteResult(None, None))
+                continue
+            v = next(it)
+            out.append(v if isinstance(v, Exception) else WriteResult(sha, v))
+        return out
+
+
+_WRITERS: Dict[str, FileWriter] = {}
+
+
+def get_writer(local_path: str, repo_path: str, reload: Callable[[str], Any]) -> FileWriter:
+    """Jediný FileWriter pro daný lokální soubor."""
+    w = _WRITERS.get(local_path)
+    if w is None:
+        w = _WRITERS[local_path] = FileWriter(local_path, repo_path, reload)
+    return w
+
+
+def all_writers() -> List[FileWriter]:
+    return list(_WRITERS.values())
+
+
+def drop_writer(local_path: str) -> bool:
+    """Ukončí a zapomene zapisovač souboru, pokud nic nezapisuje. False = je rozpracovaný."""
+    w = _WRITERS.get(local_path)
+    if w is None:
+        return True
+    if not w.idle():
+        return False
+    w.stop()
+    del _WRITERS[local_path]
+    return True
+
+
+def append_lines(lines: bytes, header: List[str]) -> Mutation:
+    """Mutace: připojí hotové CSV řádky na konec souboru (prázdný soubor dostane hlavičku)."""
+    def mutate(content: bytes):
+        if not content.strip():
+            content = (",".join(header) + "\n").encode("utf-8")
+        elif not content.endswith(b"\n"):
+            content += b"\n"
+        return content + lines, lines.count(b"\n"), None
+    return mutate